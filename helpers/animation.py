@@ -0,0 +1,136 @@
+# Multi-frame emoji animations: a keyframe plus XOR deltas of packed 1-bpp frames
+import struct
+
+ANIM_MAGIC = b"EANM"
+ANIM_VERSION = 1
+
+KIND_KEY = 0   # Payload is the whole frame, packed rows in display polarity
+KIND_XOR = 1   # Payload is a change box followed by XOR spans against the previous frame
+
+_HEADER = "<4sBHHB"   # magic, version, width, height, frame count
+_RECORD = "<HBH"      # delay in ms, kind, payload length
+_BOX = "<BBBB"        # first byte column, first row, byte columns, rows
+_SPAN = "<HB"         # unchanged bytes skipped since the previous span, changed byte count
+
+# Unchanged gaps shorter than a span header are cheaper to send as zero XOR bytes
+_MIN_GAP = struct.calcsize(_SPAN)
+_MAX_SPAN = 255
+
+
+def encode_animation(frames, width, height, delays):
+    """Pack frames (bytes in display polarity, MSB first) into the animation format
+
+    The file holds frame 0 as a keyframe, then one XOR delta per following
+    frame and a final delta from the last frame back to the first, so a
+    looping player never has to decode the keyframe again.
+    """
+    count = len(frames)
+    out = bytearray(struct.pack(_HEADER, ANIM_MAGIC, ANIM_VERSION, width, height, count))
+    out += struct.pack(_RECORD, delays[0], KIND_KEY, len(frames[0]))
+    out += frames[0]
+    for i in range(1, count + 1):
+        payload = encode_delta(frames[i - 1], frames[i % count], width, height)
+        out += struct.pack(_RECORD, delays[i % count], KIND_XOR, len(payload))
+        out += payload
+    return bytes(out)
+
+
+def encode_delta(previous, current, width, height):
+    """XOR spans turning previous into current, preceded by their bounding box"""
+    stride = (width + 7) // 8
+    changed = [i for i in range(len(current)) if previous[i] != current[i]]
+    if not changed:
+        return struct.pack(_BOX, 0, 0, 0, 0)
+
+    rows = [i // stride for i in changed]
+    cols = [i % stride for i in changed]
+    out = bytearray(struct.pack(_BOX, min(cols), rows[0], max(cols) - min(cols) + 1,
+                                rows[-1] - rows[0] + 1))
+
+    # Group changed bytes into spans, bridging short unchanged gaps
+    position = 0
+    i = 0
+    while i < len(changed):
+        start = changed[i]
+        end = start + 1
+        i += 1
+        while i < len(changed) and changed[i] - end < _MIN_GAP and changed[i] + 1 - start <= _MAX_SPAN:
+            end = changed[i] + 1
+            i += 1
+        skip = start - position
+        while skip > 0xFFFF:
+            out += struct.pack(_SPAN, 0xFFFF, 0)
+            skip -= 0xFFFF
+        out += struct.pack(_SPAN, skip, end - start)
+        out += bytes(previous[j] ^ current[j] for j in range(start, end))
+        position = end
+    return bytes(out)
+
+
+class Animation:
+    """A loaded animation file; frame records are kept as views into its bytes"""
+
+    def __init__(self, data):
+        magic, version, width, height, count = struct.unpack_from(_HEADER, data, 0)
+        if magic != ANIM_MAGIC or version != ANIM_VERSION:
+            raise ValueError("not an emoji animation")
+        self.width = width
+        self.height = height
+        self.frame_count = count
+
+        # (delay_ms, payload) per record: the keyframe, then count deltas
+        self.records = []
+        view = memoryview(data)
+        pos = struct.calcsize(_HEADER)
+        record_size = struct.calcsize(_RECORD)
+        for i in range(count + 1):
+            delay, kind, length = struct.unpack_from(_RECORD, data, pos)
+            pos += record_size
+            if kind != (KIND_KEY if i == 0 else KIND_XOR) or pos + length > len(data):
+                raise ValueError("corrupt animation record")
+            self.records.append((delay, view[pos:pos + length]))
+            pos += length
+
+
+def load_animation(path):
+    with open(path, 'rb') as f:
+        return Animation(f.read())
+
+
+class AnimationPlayer:
+    """Steps through an Animation in one reused frame buffer"""
+
+    def __init__(self, animation):
+        self.animation = animation
+        self.stride = (animation.width + 7) // 8
+        self.frame = bytearray(animation.records[0][1])
+        self.index = 0  # Frame currently held in self.frame
+
+    def reset(self):
+        """Go back to the keyframe; return how long it stays on screen, in ms"""
+        delay, payload = self.animation.records[0]
+        self.frame[:] = payload
+        self.index = 0
+        return delay
+
+    def advance(self):
+        """Apply the next delta in place; return (delay_ms, box) with box in byte columns and rows"""
+        next_index = self.index + 1
+        delay, payload = self.animation.records[next_index]
+        self.index = next_index % self.animation.frame_count
+
+        frame = self.frame
+        box = struct.unpack_from(_BOX, payload, 0)
+        pos = struct.calcsize(_BOX)
+        span_size = struct.calcsize(_SPAN)
+        offset = 0
+        end = len(payload)
+        while pos < end:
+            skip, count = struct.unpack_from(_SPAN, payload, pos)
+            pos += span_size
+            offset += skip
+            for i in range(count):
+                frame[offset + i] ^= payload[pos + i]
+            offset += count
+            pos += count
+        return delay, box
@@ -0,0 +1,222 @@
+# Pre-scaled emoji sprite atlas, built on first launch and reused afterwards
+import os
+import struct
+import binascii
+
+from . import emoji_data
+from .bitmap import PackedBitmap, scale_bitmap, shrink_bitmap
+from .stamps import STAMP, check_stamps, file_stamp, files_crc
+
+ATLAS_FILE = "atlas.bin"
+ATLAS_MAGIC = b"EJAT"
+ATLAS_VERSION = 2
+
+# Layout areas sprites are pre-rendered for, as (top, bottom) y positions
+AREA_SELECT = 0    # Selection screen, between title and footer
+AREA_RECEIVED = 1  # Received screen, between emoji name and footer
+LAYOUT_AREAS = ((27, 175), (80, 170))
+
+# Reaction burst thumbnails: shrunk copies placed at the top-left of a grid
+# cell, so their position is relative to the cell rather than the screen
+AREA_BURST = 2
+BURST_SHRINK = 3
+BURST_CELL = 50
+
+# The header is followed by one STAMP per source file (the bundle, or every
+# PBM in EMOJI_ORDER), then the entries
+_HEADER = "<4sBIIB"   # magic, version, layout crc, source crc, entry count
+_ENTRY = "<BBhhHHI"   # emoji index, area, x, y, width, height, data offset
+
+
+def place_in_area(width, height, area_width, area_top, area_bottom):
+    """Return (scale, x, y) that scales an image up to fit an area and centers it"""
+    area_height = area_bottom - area_top
+
+    # Scale up the emoji if it's smaller than the available space
+    scale = min(area_width // width, area_height // height)
+    if scale < 1:
+        scale = 1
+
+    x = (area_width - width * scale) // 2
+    y = area_top + (area_height - height * scale) // 2
+    return scale, x, y
+
+
+def _invert(data):
+    """Copy packed pixels flipping every bit (PBM black-is-1 to display polarity)"""
+    out = bytearray(data)
+    for i in range(len(out)):
+        out[i] ^= 0xFF
+    return out
+
+
+class Sprite:
+    """A pre-positioned bitmap stored in display polarity (bit set = white)"""
+    __slots__ = ("x", "y", "bitmap", "frame")
+
+    def __init__(self, x, y, bitmap):
+        self.x = x
+        self.y = y
+        self.bitmap = bitmap
+        self.frame = None  # FrameBuffer wrapper, created by the renderer on first blit
+
+
+class SpriteAtlas:
+    def __init__(self, logger, app_name, pbm_parser, display_width, display_height):
+        self.logger = logger
+        self.pbm_parser = pbm_parser
+        self.display_width = display_width
+        self.display_height = display_height
+        self.path = f"/apps/{app_name}/{ATLAS_FILE}"
+
+        self._sprites = {}
+        self._loaded = False  # load() runs on the first get() unless called earlier
+        self.rebuilds = 0
+
+    def load(self):
+        """Load the atlas, rebuilding it first if it is missing or stale"""
+        self._loaded = True
+        try:
+            if not self._load_file():
+                self.build()
+                if not self._load_file():
+                    raise ValueError("Rebuilt atlas failed validation")
+        except Exception as e:
+            self.logger.error("Sprite atlas unavailable: %s", e)
+            self._sprites = {}
+        return bool(self._sprites)
+
+    def get(self, emoji_key, area):
+        """Return the Sprite for an emoji in a layout area, or None"""
+        if not self._loaded:
+            self.load()
+        return self._sprites.get((emoji_key, area))
+
+    def build(self):
+        """Pre-render every emoji for every layout area into the atlas file"""
+        self.logger.info("Building sprite atlas at %s", self.path)
+        entries = []
+        blobs = []
+        offset = 0
+
+        for index, emoji_key in enumerate(emoji_data.EMOJI_ORDER):
+            width, height, bitmap = self.pbm_parser.parse_emoji(emoji_key)
+            if bitmap is None:
+                raise ValueError(f"Cannot load emoji {emoji_key}")
+
+            for area, (area_top, area_bottom) in enumerate(LAYOUT_AREAS):
+                scale, x, y = place_in_area(width, height, self.display_width, area_top, area_bottom)
+                scaled = scale_bitmap(bitmap, scale)
+
+                # Store in display polarity so sprites can be blitted as-is
+                native = _invert(scaled.data)
+                entries.append((index, area, x, y, scaled.width, scaled.height, offset))
+                blobs.append(native)
+                offset += len(native)
+
+            thumb = shrink_bitmap(bitmap, BURST_SHRINK)
+            native = _invert(thumb.data)
+            entries.append((index, AREA_BURST, 0, 0, thumb.width, thumb.height, offset))
+            blobs.append(native)
+            offset += len(native)
+
+        header = struct.pack(_HEADER, ATLAS_MAGIC, ATLAS_VERSION,
+                             self._layout_crc(), self._source_crc(), len(entries))
+        stamps = self._asset_stamps()
+        data_start = (struct.calcsize(_HEADER)
+                      + struct.calcsize(STAMP) * len(stamps)
+                      + struct.calcsize(_ENTRY) * len(entries))
+
+        # Write to a temporary file first so a power loss never leaves a torn atlas
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(header)
+            for stamp in stamps:
+                f.write(struct.pack(STAMP, stamp[0], stamp[1]))
+            for entry in entries:
+                index, area, x, y, width, height, rel = entry
+                f.write(struct.pack(_ENTRY, index, area, x, y, width, height, data_start + rel))
+            for blob in blobs:
+                f.write(blob)
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+        os.rename(tmp_path, self.path)
+        self.rebuilds += 1
+
+    def _load_file(self):
+        """Read and validate the atlas file; return False if it must be rebuilt"""
+        # Sprites are views into this buffer, and framebuf needs it writable
+        try:
+            size = os.stat(self.path)[6]
+            data = bytearray(size)
+            with open(self.path, "rb") as f:
+                if f.readinto(data) != size:
+                    return False
+        except OSError:
+            return False
+
+        header_size = struct.calcsize(_HEADER)
+        if len(data) < header_size:
+            return False
+        magic, version, layout_crc, source_crc, count = struct.unpack_from(_HEADER, data, 0)
+        if magic != ATLAS_MAGIC or version != ATLAS_VERSION or layout_crc != self._layout_crc():
+            return False
+
+        stamp_size = struct.calcsize(STAMP)
+        current = self._asset_stamps()
+        stored = [struct.unpack_from(STAMP, data, header_size + i * stamp_size)
+                  for i in range(len(current))]
+        if not check_stamps(stored, current, source_crc, self._source_crc, self._write_stamps):
+            self.logger.info("Emoji assets changed, sprite atlas is stale")
+            return False
+        pos = header_size + stamp_size * len(current)
+
+        view = memoryview(data)
+        entry_size = struct.calcsize(_ENTRY)
+        sprites = {}
+        for _ in range(count):
+            index, area, x, y, width, height, offset = struct.unpack_from(_ENTRY, data, pos)
+            pos += entry_size
+            size = ((width + 7) // 8) * height
+            bitmap = PackedBitmap(width, height, view[offset:offset + size])
+            sprites[(emoji_data.EMOJI_ORDER[index], area)] = Sprite(x, y, bitmap)
+
+        self._sprites = sprites
+        return True
+
+    def _write_stamps(self, stamps):
+        """Refresh stored mtimes/sizes after a touch that did not change content"""
+        with open(self.path, "r+b") as f:
+            f.seek(struct.calcsize(_HEADER))
+            for stamp in stamps:
+                f.write(struct.pack(STAMP, stamp[0], stamp[1]))
+
+    def _asset_path(self, emoji_key):
+        return f"{self.pbm_parser.base_dir}/{emoji_data.EMOJIS[emoji_key]['pbm_file']}"
+
+    def _asset_stamps(self):
+        """(mtime, size) of the files sprites are built from: just the bundle when there is one"""
+        bundle = self.pbm_parser.open_bundle()
+        if bundle is not None:
+            paths = [bundle.path]
+        else:
+            paths = [self._asset_path(emoji_key) for emoji_key in emoji_data.EMOJI_ORDER]
+        return [file_stamp(path) for path in paths]
+
+    def _source_crc(self):
+        """CRC32 over the contents of every emoji asset; the bundle stores it precomputed"""
+        bundle = self.pbm_parser.open_bundle()
+        if bundle is not None:
+            return bundle.source_crc
+        return files_crc([self._asset_path(emoji_key) for emoji_key in emoji_data.EMOJI_ORDER])
+
+    def _layout_crc(self):
+        """CRC32 over everything besides asset contents that shapes the atlas"""
+        parts = [f"{self.display_width}x{self.display_height}", repr(LAYOUT_AREAS),
+                 f"burst={BURST_SHRINK}/{BURST_CELL}",
+                 "bundle" if self.pbm_parser.open_bundle() is not None else "pbm"]
+        for emoji_key in emoji_data.EMOJI_ORDER:
+            parts.append(f"{emoji_key}={emoji_data.EMOJIS[emoji_key]['pbm_file']}")
+        return binascii.crc32(";".join(parts).encode()) & 0xFFFFFFFF
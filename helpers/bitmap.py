@@ -0,0 +1,113 @@
+# Packed 1-bit-per-pixel bitmap shared by the parser and the display code
+
+
+class PackedBitmap:
+    """Monochrome image stored as packed rows, MSB first, 1 = black (PBM P4 layout)"""
+    __slots__ = ("width", "height", "stride", "data")
+
+    def __init__(self, width, height, data=None):
+        self.width = width
+        self.height = height
+        self.stride = (width + 7) // 8
+
+        size = self.stride * height
+        if data is None:
+            data = bytearray(size)
+        elif len(data) < size:
+            raise ValueError(f"Bitmap data too short: {len(data)} < {size} bytes")
+
+        # A memoryview lets the bitmap wrap a file buffer without copying it
+        self.data = memoryview(data)[:size]
+
+    @property
+    def nbytes(self):
+        return self.stride * self.height
+
+    def row(self, y):
+        """Return the packed bytes of row y (a memoryview, not a copy)"""
+        start = y * self.stride
+        return self.data[start:start + self.stride]
+
+    def pixel(self, x, y):
+        """Return 1 for a black pixel, 0 for white"""
+        return (self.data[y * self.stride + (x >> 3)] >> (7 - (x & 7))) & 1
+
+    def set_pixel(self, x, y, value):
+        """Set a pixel; only valid when the bitmap owns a writable buffer"""
+        idx = y * self.stride + (x >> 3)
+        mask = 0x80 >> (x & 7)
+        if value:
+            self.data[idx] |= mask
+        else:
+            self.data[idx] &= ~mask & 0xFF
+
+    def runs(self, y, value=1):
+        """Yield (x, length) for each horizontal run of value in row y"""
+        return row_runs(self.row(y), self.width, value)
+
+
+def row_runs(row, width, value=1):
+    """Yield (x, length) for each horizontal run of value in a packed row"""
+    empty = 0x00 if value else 0xFF
+    full = 0xFF if value else 0x00
+    start = -1
+    x = 0
+
+    for byte in row:
+        if x >= width:
+            break
+
+        # Whole bytes with no edges are the common case in emoji art
+        if byte == empty:
+            if start >= 0:
+                yield start, x - start
+                start = -1
+            x += 8
+            continue
+        if byte == full:
+            if start < 0:
+                start = x
+            x += 8
+            continue
+
+        for bit in range(7, -1, -1):
+            if x >= width:
+                break
+            if ((byte >> bit) & 1) == value:
+                if start < 0:
+                    start = x
+            elif start >= 0:
+                yield start, x - start
+                start = -1
+            x += 1
+
+    if start >= 0:
+        yield start, min(x, width) - start
+
+
+def scale_bitmap(bitmap, factor):
+    """Return bitmap scaled up by an integer factor (the same object for factor 1)"""
+    if factor == 1:
+        return bitmap
+
+    scaled = PackedBitmap(bitmap.width * factor, bitmap.height * factor)
+    for y in range(bitmap.height):
+        for run_x, run_len in bitmap.runs(y):
+            for out_x in range(run_x * factor, (run_x + run_len) * factor):
+                for sy in range(factor):
+                    scaled.set_pixel(out_x, y * factor + sy, 1)
+    return scaled
+
+
+def shrink_bitmap(bitmap, factor):
+    """Return bitmap scaled down by an integer factor; a block with any black pixel stays black"""
+    if factor == 1:
+        return bitmap
+
+    shrunk = PackedBitmap(bitmap.width // factor, bitmap.height // factor)
+    for y in range(shrunk.height * factor):
+        for run_x, run_len in bitmap.runs(y):
+            end = min(run_x + run_len, shrunk.width * factor)
+            for out_x in range(run_x // factor, (end + factor - 1) // factor):
+                shrunk.set_pixel(out_x, y // factor, 1)
+    return shrunk
@@ -0,0 +1,164 @@
+# Every emoji bitmap packed into one file, read through an offset index
+import struct
+
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+from .stamps import NO_STAMP, STAMP, check_stamps, file_stamp, files_crc
+
+BUNDLE_FILE = "assets/emoji.bundle"
+BUNDLE_MAGIC = b"EJBN"
+BUNDLE_VERSION = 2
+
+# The header is followed by one STAMP per entry for its source PBM file,
+# then the index
+_HEADER = "<4sBBI"  # magic, version, entry count, CRC32 of the source PBM files
+_ENTRY = "<12sIHH"  # emoji key (NUL padded), data offset, width, height
+KEY_SIZE = 12
+
+
+def pack_bundle(images, source_crc):
+    """Build bundle bytes from [(emoji_key, width, height, packed P4 rows), ...]
+
+    Source stamps are left unrecorded; the badge fills them in on first open.
+    """
+    header_size = (struct.calcsize(_HEADER) + struct.calcsize(STAMP) * len(images)
+                   + struct.calcsize(_ENTRY) * len(images))
+    out = bytearray(struct.pack(_HEADER, BUNDLE_MAGIC, BUNDLE_VERSION, len(images), source_crc))
+    for _ in images:
+        out += struct.pack(STAMP, NO_STAMP[0], NO_STAMP[1])
+    offset = header_size
+    for emoji_key, width, height, data in images:
+        key = emoji_key.encode()
+        if len(key) > KEY_SIZE:
+            raise ValueError(f"Emoji key too long for the bundle index: {emoji_key}")
+        out += struct.pack(_ENTRY, key, offset, width, height)
+        offset += len(data)
+    for _, _, _, data in images:
+        out += data
+    return bytes(out)
+
+
+class AssetBundle:
+    """Random access to the bitmaps in a bundle file
+
+    The header, source stamps and index are read once. The first read()
+    maps the whole file where mmap exists, so entries are views into it;
+    otherwise the file stays open and an entry costs one seek and one
+    readinto a buffer reused between reads.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = {}            # emoji key -> (offset, width, height)
+        self.keys = []             # Emoji keys in index order
+        self.source_crc = 0
+        self.source_stamps = []    # (mtime, size) of each key's PBM file, as last checked
+        self.source_paths = []     # Where check_sources() found the PBM files
+        self.stamp = None          # (mtime, size) of the file when it was opened
+        self.stable_views = False  # True when read() views stay valid after the next read
+
+        self._file = None
+        self._map = None
+        self._buf = None
+        self.reads = 0
+
+        with open(path, "rb") as f:
+            header = f.read(struct.calcsize(_HEADER))
+            magic, version, count, self.source_crc = struct.unpack(_HEADER, header)
+            if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+                raise ValueError("Not an emoji bundle")
+            stamp_size = struct.calcsize(STAMP)
+            stamps = f.read(stamp_size * count)
+            entry_size = struct.calcsize(_ENTRY)
+            index = f.read(entry_size * count)
+        for i in range(count):
+            key, offset, width, height = struct.unpack_from(_ENTRY, index, i * entry_size)
+            key = bytes(key).rstrip(b"\0").decode()
+            self.index[key] = (offset, width, height)
+            self.keys.append(key)
+            self.source_stamps.append(struct.unpack_from(STAMP, stamps, i * stamp_size))
+        self.stamp = file_stamp(path)
+
+    def __contains__(self, emoji_key):
+        return emoji_key in self.index
+
+    def check_sources(self, paths):
+        """Return True if the PBM files at paths, in index order, still match the bundle
+
+        A file that is not there is left to the bundle. Raises OSError if a
+        changed file cannot be read back.
+        """
+        current = []
+        for path, stored in zip(paths, self.source_stamps):
+            try:
+                current.append(file_stamp(path))
+            except OSError:
+                current.append(stored)
+        self.source_paths = paths
+        return check_stamps(self.source_stamps, current, self.source_crc,
+                            self._sources_crc, self._write_source_stamps)
+
+    def _sources_crc(self):
+        return files_crc(self.source_paths)
+
+    def _write_source_stamps(self, stamps):
+        """Store the PBM mtimes/sizes seen on this device; best effort, as they only save a CRC"""
+        self.source_stamps = list(stamps)
+        try:
+            with open(self.path, "r+b") as f:
+                f.seek(struct.calcsize(_HEADER))
+                for stamp in stamps:
+                    f.write(struct.pack(STAMP, stamp[0], stamp[1]))
+        except OSError:
+            return
+        self.stamp = file_stamp(self.path)
+
+    def read(self, emoji_key):
+        """Return (width, height, packed rows) for an entry, or None if absent
+
+        Unless stable_views is set, the rows live in a shared buffer that the
+        next read() overwrites; copy them to keep them.
+        """
+        entry = self.index.get(emoji_key)
+        if entry is None:
+            return None
+        offset, width, height = entry
+        size = ((width + 7) // 8) * height
+        if self._file is None:
+            self._open_data()
+        self.reads += 1
+        if self._map is not None:
+            return width, height, self._map[offset:offset + size]
+
+        view = memoryview(self._buf)[:size]
+        self._file.seek(offset)
+        filled = 0
+        while filled < size:
+            got = self._file.readinto(view[filled:])
+            if not got:
+                raise ValueError(f"Truncated bundle entry {emoji_key}")
+            filled += got
+        return width, height, view
+
+    def _open_data(self):
+        """Open the file for entry reads: mapped if possible, else with a shared buffer"""
+        self._file = open(self.path, "rb")
+        if mmap is not None:
+            try:
+                self._map = memoryview(mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ))
+                self.stable_views = True
+                return
+            except (OSError, ValueError, AttributeError):
+                self._map = None
+        largest = max([((w + 7) // 8) * h for _, w, h in self.index.values()] or [0])
+        self._buf = bytearray(largest)
+
+    def close(self):
+        # Views handed out keep a mapping alive, so it is dropped rather than closed
+        self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -1,72 +1,139 @@
 import badge
 import time
 
+from . import emoji_data
+from .renderer import BitmapRenderer
+from .text_layout import TextLayout
+from .animation import load_animation, AnimationPlayer
+from .atlas import AREA_SELECT, AREA_RECEIVED, AREA_BURST, BURST_SHRINK, BURST_CELL, LAYOUT_AREAS, place_in_area
+from .bitmap import shrink_bitmap
+
+# Redraw the whole screen once the changed area passes this share of it
+FULL_REDRAW_RATIO = 0.6
+MAX_DIRTY_RECTS = 4
+
+# Reaction burst grid: thumbnails with an "xN" count below them; up to "x255"
+# (32 px in the 8x8 font) fits the cell width
+BURST_COLUMNS = 4
+BURST_GRID_TOP = 75
+BURST_ROW_HEIGHT = 48
+BURST_COUNT_DX = 0
+BURST_COUNT_DY = 36
+
+# Times an animated emoji plays through before it rests on its first frame
+ANIMATION_LOOPS = 2
+
 class DisplayManager:
-    def __init__(self, logger, app_name, pbm_parser, sound_manager):
+    def __init__(self, logger, app_name, pbm_parser, atlas=None):
         self.logger = logger
         self.app_name = app_name
         self.pbm_parser = pbm_parser
-        self.sound_manager = sound_manager
+        self.atlas = atlas
+        self.renderer = BitmapRenderer(badge.display)
+        self.text = TextLayout(badge.display, self.renderer)
+        
+        # Retained model of the screen: the display list that was last drawn
+        self._screen_ops = None
+        
+        # Menu display list and framebuffer snapshot, rebuilt when the layout inputs change
+        self._menu_signature_cached = None
+        self._menu_ops = None
+        self._menu_frame = None
+        
+        # Animated emoji on screen, stepped by tick_animation() between loop iterations
+        self._animation = None         # AnimationPlayer for the "anim" op currently shown
+        self._animation_player = None  # Last loaded player, kept while stopped
+        self._animation_op = None
+        self._animation_pos = (0, 0)
+        self._animation_due = None     # Monotonic time of the next frame; None until first drawn
+        self._animation_left = 0       # Frames still to play before the animation stops
+        self._no_animation = set()     # Emoji keys whose animation file is missing or unusable
+        self.animation_frames = 0
+        
+        # Partial refresh is optional in the display driver
+        self._show_partial = getattr(badge.display, "show_partial", None)
+        
+        # Stats for the last presented frame
+        self.last_frame_primitives = 0  # Display primitive calls spent on images
+        self.last_dirty_rects = []
+        self.full_refreshes = 0
+        self.partial_refreshes = 0
+    
+    def invalidate(self):
+        """Forget what is on screen so the next frame is drawn in full"""
+        self._screen_ops = None
     
     def draw_menu(self):
-        """Draw the emoji selection menu"""
-        # Import here to avoid circular imports
-        from . import emoji_data
-        
-        badge.display.fill(1)
+        """Draw the emoji selection menu, restoring a cached frame when possible"""
+        signature = self._menu_signature()
+        if signature != self._menu_signature_cached:
+            self._menu_ops = self._layout_menu()
+            self._menu_frame = None
+            self._menu_signature_cached = signature
         
-        badge.display.nice_text(self.app_name, 50, 5, font=24, color=0)
-        badge.display.hline(0, 30, badge.display.width, 0)
+        self._present(self._menu_ops, self._menu_frame)
+        if self._menu_frame is None:
+            self._menu_frame = self.renderer.snapshot()
+    
+    def _menu_signature(self):
+        """Everything the menu layout depends on; a change invalidates the cache"""
+        items = tuple((key, emoji_data.EMOJIS[key]["name"], emoji_data.EMOJIS[key]["button"])
+                      for key in emoji_data.EMOJI_ORDER)
+        return (items, badge.display.width, badge.display.height)
+    
+    def _layout_menu(self):
+        """Build the display list for the menu"""
+        width = badge.display.width
+        ops = [
+            ("text", self.app_name, 50, 5, 24),
+            ("hline", 0, 30, width),
+        ]
         
         y_position = 40
         line_height = 19
         
         for emoji_key in emoji_data.EMOJI_ORDER:
             emoji_data_item = emoji_data.EMOJIS[emoji_key]
-            badge.display.nice_text(emoji_data_item["name"], 10, y_position, font=18, color=0)
+            ops.append(("text", emoji_data_item["name"], 10, y_position, 18))
             
             button_text = f"[{emoji_data_item['button']}]"
-            text_width = len(button_text) * 10
-            badge.display.nice_text(button_text, badge.display.width - text_width - 10, y_position, font=18, color=0)
+            text_width, _ = self.text.measure(button_text, 18)
+            ops.append(("text", button_text, width - text_width - 10, y_position, 18))
             
             y_position += line_height
             
             if y_position < 185:
-                badge.display.hline(0, y_position - 2, badge.display.width, 0)
+                ops.append(("hline", 0, y_position - 2, width))
         
-        badge.display.show()
+        return ops
     
     def draw_emoji(self, emoji_key):
         """Draw the selected emoji in large format"""
-        # Import here to avoid circular imports
-        from . import emoji_data
-        
-        badge.display.fill(1)
-        
         emoji_data_item = emoji_data.EMOJIS[emoji_key]
+        width = badge.display.width
         
-        title = emoji_data_item["name"]
-        badge.display.nice_text(title, 10, 2, font=24, color=0)
-        
-        badge.display.hline(0, 32, badge.display.width, 0)
+        # Animated emoji replace the static sprite; tick_animation() plays them
+        sprite_op = ("sprite", emoji_key, AREA_SELECT)
+        if self._start_animation(emoji_key, AREA_SELECT):
+            sprite_op = self._animation_op
         
-        self.draw_emoji_from_pbm(emoji_data_item["pbm_file"])
-        
-        badge.display.hline(0, 175, badge.display.width, 0)
-        badge.display.nice_text("Go Back", 10, 182, font=18, color=0)
-        badge.display.nice_text("[SW5]", badge.display.width - 50, 182, font=18, color=0)
-        
-        badge.display.show()
+        ops = [
+            ("text", emoji_data_item["name"], 10, 2, 24),
+            ("hline", 0, 32, width),
+            sprite_op,
+            ("hline", 0, 175, width),
+            ("text", "Go Back", 10, 182, 18),
+            ("text", "[SW5]", width - self.text.measure("[SW5]", 18)[0] - 10, 182, 18),
+        ]
+        self._present(ops)
     
-    def draw_received_emoji(self, received_emoji):
+    def draw_received_emoji(self, received_emoji, history_pos=1, history_len=1):
         """Display a received emoji from another badge with improved UI"""
-        # Import here to avoid circular imports
-        from . import emoji_data
-        
         if not received_emoji:
             return
-            
-        badge.display.fill(1)
+        
+        width = badge.display.width
+        ops = []
         
         # Get sender handle and format it properly
         sender_handle = received_emoji['sender']
@@ -75,130 +142,351 @@ class DisplayManager:
         
         # Main message - "@handle says" - centered and prominent
         says_text = f"{sender_handle} says"
-        says_width = len(says_text) * 9  # Approximate character width for font 24
-        says_x = (badge.display.width - says_width) // 2
-        badge.display.nice_text(says_text, says_x, 15, font=24, color=0)
+        says_width, _ = self.text.measure(says_text, 24)
+        says_x = (width - says_width) // 2
+        ops.append(("text", says_text, says_x, 15, 24))
         
         # Subtle separator line
-        badge.display.hline(20, 45, badge.display.width - 40, 0)
+        ops.append(("hline", 20, 45, width - 40))
         
         # Emoji name - smaller, less prominent
         emoji_data_item = emoji_data.EMOJIS.get(received_emoji['emoji'])
-        if emoji_data_item:
+        burst = received_emoji.get('burst')
+        if burst:
+            total = sum(count for _, count in burst)
+            burst_text = f"{total} reactions"
+            ops.append(("text", burst_text, (width - self.text.measure(burst_text, 18)[0]) // 2, 55, 18))
+            ops.extend(self._layout_burst(burst))
+        elif emoji_data_item:
             emoji_name = emoji_data_item['name']
-            name_width = len(emoji_name) * 7  # Approximate character width for font 18
-            name_x = (badge.display.width - name_width) // 2
-            badge.display.nice_text(emoji_name, name_x, 55, font=18, color=0)
+            name_width, _ = self.text.measure(emoji_name, 18)
+            name_x = (width - name_width) // 2
+            ops.append(("text", emoji_name, name_x, 55, 18))
             
             # Draw emoji with more space (starts lower to avoid overlap)
-            self.draw_emoji_from_pbm_received(emoji_data_item["pbm_file"])
+            ops.append(("sprite", received_emoji['emoji'], AREA_RECEIVED))
         else:
-            badge.display.nice_text("Unknown Emoji", 60, 80, font=18, color=0)
+            ops.append(("text", "Unknown Emoji", 60, 80, 18))
+        
+        # Position in received history, e.g. "2/5", when there is more than one
+        if history_len > 1:
+            ops.append(("text", f"{history_pos}/{history_len}", 5, 55, 18))
         
         # Bottom instruction area - more subtle
-        badge.display.hline(0, 175, badge.display.width, 0)
-        badge.display.nice_text("Back [SW5]", 10, 182, font=18, color=0)
+        ops.append(("hline", 0, 175, width))
+        ops.append(("text", "Back [SW5]", 10, 182, 18))
         
         # Auto-close indicator - updated timing
-        badge.display.nice_text("Auto-close 25s", 120, 182, font=18, color=0)
+        ops.append(("text", "Auto-close 25s", 120, 182, 18))
+        
+        self._present(ops)
+    
+    def _layout_burst(self, burst):
+        """Build the display list for a grid of (emoji_key, count) thumbnails"""
+        ops = []
+        columns = min(BURST_COLUMNS, len(burst))
+        left = (badge.display.width - columns * BURST_CELL) // 2
+        for i, (emoji_key, count) in enumerate(burst):
+            if emoji_key not in emoji_data.EMOJIS:
+                continue
+            x = left + (i % columns) * BURST_CELL
+            y = BURST_GRID_TOP + (i // columns) * BURST_ROW_HEIGHT
+            ops.append(("sprite_at", emoji_key, AREA_BURST, x, y))
+            if count > 1:
+                ops.append(("label", f"x{min(count, 255)}", x + BURST_COUNT_DX, y + BURST_COUNT_DY))
+        return ops
+    
+    def _present(self, ops, frame=None):
+        """Show a screen described as a display list, redrawing only what changed
+
+        If frame holds a snapshot of exactly this screen it is restored with one
+        blit instead of replaying the ops.
+        """
+        self.renderer.reset_calls()
+        if self._animation is not None and self._animation_op not in ops:
+            self.stop_animation()
+        previous = self._screen_ops
+        self._screen_ops = ops
+        
+        screen_rect = (0, 0, badge.display.width, badge.display.height)
+        dirty = [screen_rect]
+        full = True
+        if previous is not None:
+            # Ops present in both screens are already correct on the framebuffer
+            old_ops = set(previous)
+            new_ops = set(ops)
+            changed = [op for op in previous if op not in new_ops]
+            changed.extend(op for op in ops if op not in old_ops)
+            if not changed:
+                self.last_dirty_rects = []
+                self.last_frame_primitives = 0
+                return
+            
+            dirty = _merge_rects([self._op_rect(op) for op in changed])
+            dirty_area = sum(w * h for _, _, w, h in dirty)
+            screen_area = screen_rect[2] * screen_rect[3]
+            full = len(dirty) > MAX_DIRTY_RECTS or dirty_area > FULL_REDRAW_RATIO * screen_area
+            if full:
+                dirty = [screen_rect]
+        
+        if frame is not None:
+            self.renderer.restore(frame)
+        elif full:
+            badge.display.fill(1)
+            for op in ops:
+                self._draw_op(op)
+        else:
+            for x, y, w, h in dirty:
+                badge.display.fill_rect(x, y, w, h, 1)
+            
+            # Redraw every op touching a dirty rect; parts outside it are unchanged pixels
+            for op in ops:
+                rect = self._op_rect(op)
+                for dirty_rect in dirty:
+                    if _intersects(rect, dirty_rect):
+                        self._draw_op(op)
+                        break
         
-        badge.display.show()
+        self.last_dirty_rects = dirty
+        self.last_frame_primitives = self.renderer.calls
+        if self._show_partial and not full:
+            for x, y, w, h in dirty:
+                self._show_partial(x, y, w, h)
+            self.partial_refreshes += 1
+        else:
+            badge.display.show()
+            self.full_refreshes += 1
+    
+    def _draw_op(self, op):
+        kind = op[0]
+        if kind == "text":
+            self.text.draw(op[1], op[2], op[3], op[4])
+        elif kind == "hline":
+            badge.display.hline(op[1], op[2], op[3], 0)
+        elif kind == "sprite":
+            self._draw_sprite_op(op[1], op[2])
+        elif kind == "sprite_at":
+            self._draw_thumbnail_op(op[1], op[2], op[3], op[4])
+        elif kind == "label":
+            badge.display.text(op[1], op[2], op[3], 0)
+        elif kind == "anim":
+            self._draw_animation_op()
     
-    def draw_emoji_from_pbm_received(self, pbm_filename):
-        """Load and draw a PBM file for received emoji display with adjusted positioning"""
+    def _start_animation(self, emoji_key, area):
+        """Prepare the emoji's animation for the next frame; False if it has none
+        
+        Every frame needs a refresh, so without partial refresh the static
+        sprite is shown instead.
+        """
+        if self._show_partial is None or emoji_key in self._no_animation:
+            return False
+        if self._animation_op is not None and self._animation_op[1:3] == (emoji_key, area):
+            # Shown before: reuse the loaded file
+            self._animation = self._animation_player
+            return True
+        
+        anim_file = emoji_data.EMOJIS[emoji_key].get("anim_file")
+        if not anim_file:
+            self._no_animation.add(emoji_key)
+            return False
         try:
-            width, height, pixel_data = self.pbm_parser.parse_pbm_file(pbm_filename)
+            animation = load_animation(f"{self.pbm_parser.base_dir}/{anim_file}")
+        except (OSError, ValueError, TypeError) as e:
+            self.logger.debug("No animation for %s: %s", emoji_key, e)
+            self._no_animation.add(emoji_key)
+            return False
+        
+        # Frames are drawn unscaled, centered where the static sprite would be
+        area_top, area_bottom = LAYOUT_AREAS[area]
+        scale, x, y = place_in_area(animation.width, animation.height, badge.display.width,
+                                    area_top, area_bottom)
+        if scale != 1:
+            self._no_animation.add(emoji_key)
+            return False
+        
+        self._animation = self._animation_player = AnimationPlayer(animation)
+        self._animation_op = ("anim", emoji_key, area, x, y, animation.width, animation.height)
+        self._animation_pos = (x, y)
+        self._animation_due = None
+        return True
+    
+    def stop_animation(self):
+        """Stop stepping the animation; its pixels stay until the area is redrawn"""
+        self._animation = None
+        self._animation_due = None
+    
+    def _draw_animation_op(self):
+        """Draw the animation's keyframe and start its clock for ANIMATION_LOOPS plays"""
+        player = self._animation
+        if player is None:
+            return
+        animation = player.animation
+        delay = player.reset()
+        x, y = self._animation_pos
+        self.renderer.draw_frame_box(player.frame, animation.width,
+                                     (0, 0, player.stride, animation.height), x, y)
+        self._animation_due = badge.time.monotonic() + delay / 1000
+        self._animation_left = animation.frame_count * ANIMATION_LOOPS
+    
+    def tick_animation(self):
+        """Show the next animation frame once it is due, redrawing only what changed
+        
+        The last frame of a play wraps back to the keyframe, so the animation
+        stops on the static sprite.
+        """
+        if self._animation is None or self._animation_due is None:
+            return
+        now = badge.time.monotonic()
+        if now < self._animation_due:
+            return
+        
+        player = self._animation
+        self.renderer.reset_calls()
+        delay, box = player.advance()
+        
+        # Keep the cadence, but never try to catch up on frames missed while busy
+        self._animation_due = max(self._animation_due + delay / 1000, now)
+        self.animation_frames += 1
+        self._animation_left -= 1
+        if self._animation_left <= 0:
+            self.stop_animation()
+        if not box[2]:
+            self.last_dirty_rects = []
+            self.last_frame_primitives = 0
+            return
+        
+        x, y = self._animation_pos
+        rect = self.renderer.draw_frame_box(player.frame, player.animation.width, box, x, y)
+        self.last_dirty_rects = [rect]
+        self.last_frame_primitives = self.renderer.calls
+        self._show_partial(*rect)
+        self.partial_refreshes += 1
+    
+    def next_animation_delay(self, idle_delay):
+        """How long the caller may sleep before the next animation frame is due"""
+        if self._animation is None or self._animation_due is None:
+            return idle_delay
+        return max(0, min(idle_delay, self._animation_due - badge.time.monotonic()))
+    
+    def _draw_sprite_op(self, emoji_key, area):
+        """Draw an emoji from the atlas, falling back to decoding its PBM file"""
+        sprite = self.atlas.get(emoji_key, area) if self.atlas else None
+        if sprite:
+            self.renderer.draw_sprite(sprite)
+        elif area == AREA_SELECT:
+            self.draw_emoji_from_pbm(emoji_key)
+        else:
+            self.draw_emoji_from_pbm_received(emoji_key)
+    
+    def _draw_thumbnail_op(self, emoji_key, area, x, y):
+        """Draw a burst thumbnail with its cell at (x, y)"""
+        sprite = self.atlas.get(emoji_key, area) if self.atlas else None
+        if sprite:
+            self.renderer.draw_sprite(sprite, x, y)
+            return
+        
+        # No atlas: shrink the cached source image on the fly
+        width, height, bitmap = self.pbm_parser.parse_emoji(emoji_key)
+        if bitmap is None:
+            badge.display.text(emoji_key[:6], x, y + 12, 0)
+            return
+        self.renderer.draw(shrink_bitmap(bitmap, BURST_SHRINK), x, y)
+    
+    def _op_rect(self, op):
+        """Conservative screen rectangle (x, y, w, h) an op may draw into"""
+        kind = op[0]
+        if kind == "text":
+            _, text, x, y, font = op
+            width, height = self.text.extent(text, font)
+            return _clip_rect(x, y, width, height)
+        if kind == "hline":
+            return _clip_rect(op[1], op[2], op[3], 1)
+        if kind == "label":
+            # Built-in 8x8 font
+            return _clip_rect(op[2], op[3], len(op[1]) * 8, 8)
+        if kind == "sprite_at":
+            return _clip_rect(op[3], op[4], BURST_CELL, BURST_ROW_HEIGHT)
+        if kind == "anim":
+            return _clip_rect(op[3], op[4], op[5], op[6])
+        
+        # Sprite: the atlas knows the exact box; otherwise cover the layout area
+        emoji_key, area = op[1], op[2]
+        sprite = self.atlas.get(emoji_key, area) if self.atlas else None
+        if sprite:
+            return _clip_rect(sprite.x, sprite.y, sprite.bitmap.width, sprite.bitmap.height)
+        area_top, area_bottom = LAYOUT_AREAS[area]
+        top, bottom = area_top, area_bottom
+        
+        # Images taller than the area overflow it evenly
+        width, height, bitmap = self.pbm_parser.parse_emoji(emoji_key)
+        if bitmap is not None:
+            scale, x, y = place_in_area(width, height, badge.display.width, area_top, area_bottom)
+            top = min(top, y)
+            bottom = max(bottom, y + height * scale)
+        return _clip_rect(0, top, badge.display.width, bottom - top)
+    
+    def draw_emoji_from_pbm_received(self, emoji_key):
+        """Load and draw an emoji bitmap for received emoji display with adjusted positioning"""
+        try:
+            width, height, bitmap = self.pbm_parser.parse_emoji(emoji_key)
             
-            if width is None or height is None or pixel_data is None:
-                self.logger.error(f"Failed to parse PBM file: {pbm_filename}")
+            if bitmap is None:
+                self.logger.error("Failed to load emoji bitmap: %s", emoji_key)
                 badge.display.text("Error loading", 60, 100, 1)
                 badge.display.text("emoji image", 60, 120, 1)
                 return
             
-            # Emoji display area specifically for received emoji 
-            emoji_area_top = 80  # Start after the emoji name
-            emoji_area_bottom = 170  # Leave more space for bottom text
-            emoji_area_height = emoji_area_bottom - emoji_area_top
-            emoji_area_width = badge.display.width
-            
-            # Scale up the emoji if it's smaller than the available space
-            scale_factor = min(emoji_area_width // width, emoji_area_height // height)
-            if scale_factor < 1:
-                scale_factor = 1
-            
-            scaled_width = width * scale_factor
-            scaled_height = height * scale_factor
-            
-            # Center the scaled emoji in the dedicated area
-            center_x = (emoji_area_width - scaled_width) // 2
-            center_y = emoji_area_top + (emoji_area_height - scaled_height) // 2
-            
-            # Draw scaled emoji
-            for y in range(height):
-                for x in range(width):
-                    if y < len(pixel_data) and x < len(pixel_data[y]):
-                        pixel_value = pixel_data[y][x]
-                        color = 1 - pixel_value
-                        
-                        # Draw scaled pixel block
-                        for sy in range(scale_factor):
-                            for sx in range(scale_factor):
-                                draw_x = center_x + x * scale_factor + sx
-                                draw_y = center_y + y * scale_factor + sy
-                                
-                                if 0 <= draw_x < badge.display.width and 0 <= draw_y < badge.display.height:
-                                    badge.display.pixel(draw_x, draw_y, color)
+            # Emoji display area specifically for received emoji, between the
+            # emoji name and the bottom text
+            self._draw_bitmap_in_area(bitmap, 80, 170)
             
         except Exception as e:
-            self.logger.error(f"PBM Error in received display: {e}")
+            self.logger.error("PBM Error in received display: %s", e)
             badge.display.text("Image error", 60, 100, 1)
 
-    def draw_emoji_from_pbm(self, pbm_filename):
-        """Load and draw a PBM file using custom parser"""
+    def draw_emoji_from_pbm(self, emoji_key):
+        """Load and draw an emoji bitmap using custom parser"""
         try:
-            width, height, pixel_data = self.pbm_parser.parse_pbm_file(pbm_filename)
+            width, height, bitmap = self.pbm_parser.parse_emoji(emoji_key)
             
-            if width is None or height is None or pixel_data is None:
-                self.logger.error(f"Failed to parse PBM file: {pbm_filename}")
+            if bitmap is None:
+                self.logger.error("Failed to load emoji bitmap: %s", emoji_key)
                 badge.display.text("Error loading", 10, 70, 1)
                 badge.display.text("emoji image", 10, 90, 1)
                 return
             
             # Emoji display area (adjusted for slightly bigger title)
-            emoji_area_height = 175 - 27  # From y=27 to y=175
-            emoji_area_width = badge.display.width
-            
-            # Scale up the emoji if it's smaller than the available space
-            scale_factor = min(emoji_area_width // width, emoji_area_height // height)
-            if scale_factor < 1:
-                scale_factor = 1
-            
-            scaled_width = width * scale_factor
-            scaled_height = height * scale_factor
-            
-            # Center the scaled emoji
-            center_x = (emoji_area_width - scaled_width) // 2
-            center_y = 27 + (emoji_area_height - scaled_height) // 2
-            
-            # Draw scaled emoji
-            for y in range(height):
-                for x in range(width):
-                    if y < len(pixel_data) and x < len(pixel_data[y]):
-                        pixel_value = pixel_data[y][x]
-                        color = 1 - pixel_value
-                        
-                        # Draw scaled pixel block
-                        for sy in range(scale_factor):
-                            for sx in range(scale_factor):
-                                draw_x = center_x + x * scale_factor + sx
-                                draw_y = center_y + y * scale_factor + sy
-                                
-                                if 0 <= draw_x < badge.display.width and 0 <= draw_y < badge.display.height:
-                                    badge.display.pixel(draw_x, draw_y, color)
+            self._draw_bitmap_in_area(bitmap, 27, 175)
             
         except Exception as e:
-            self.logger.error(f"PBM Error: {e}")
-            self.sound_manager.draw_test_pattern()
+            self.logger.error("PBM Error: %s", e)
+            self.draw_test_pattern()
+    
+    def _draw_bitmap_in_area(self, bitmap, area_top, area_bottom):
+        """Scale up a bitmap to fit the area between two y positions and center it"""
+        scale_factor, x, y = place_in_area(bitmap.width, bitmap.height, badge.display.width,
+                                           area_top, area_bottom)
+        self.renderer.draw(bitmap, x, y, scale_factor)
+    
+    def draw_pbm_streamed(self, pbm_filename, x=0, y=0, scale=1):
+        """Draw a large P4 image straight from storage, one row at a time"""
+        try:
+            with self.pbm_parser.open_pbm_stream(pbm_filename) as stream:
+                self.renderer.draw_rows(stream.rows(), stream.width, stream.height, x, y, scale)
+        except Exception as e:
+            self.logger.error("PBM stream error for %s: %s", pbm_filename, e)
+    
+    def draw_test_pattern(self):
+        """Draw a simple test pattern when PBM files can't be loaded"""
+        center_x, center_y = 100, 90
+        
+        # Simple smiley face fallback
+        badge.display.rect(center_x - 30, center_y - 30, 60, 60, 0)
+        badge.display.fill_rect(center_x - 15, center_y - 10, 5, 5, 0)
+        badge.display.fill_rect(center_x + 10, center_y - 10, 5, 5, 0)
+        badge.display.hline(center_x - 15, center_y + 10, 30, 0)
+        badge.display.pixel(center_x - 16, center_y + 9, 0)
+        badge.display.pixel(center_x + 16, center_y + 9, 0)
     
     def debug_list_files(self):
         """Debug function to list available files"""
@@ -209,9 +497,47 @@ class DisplayManager:
             for directory in directories_to_check:
                 try:
                     files = os.listdir(directory)
-                    self.logger.info(f"Files in '{directory}': {files}")
+                    self.logger.info("Files in '%s': %s", directory, files)
                 except OSError as e:
-                    self.logger.debug(f"Cannot list '{directory}': {e}")
+                    self.logger.debug("Cannot list '%s': %s", directory, e)
                     
         except Exception as e:
-            self.logger.error(f"Debug file listing error: {e}")
+            self.logger.error("Debug file listing error: %s", e)
+
+
+def _clip_rect(x, y, w, h):
+    """Clip a rectangle to the display bounds"""
+    if x < 0:
+        w += x
+        x = 0
+    if y < 0:
+        h += y
+        y = 0
+    w = max(0, min(w, badge.display.width - x))
+    h = max(0, min(h, badge.display.height - y))
+    return (x, y, w, h)
+
+
+def _intersects(a, b):
+    return a[0] < b[0] + b[2] and b[0] < a[0] + a[2] and a[1] < b[1] + b[3] and b[1] < a[1] + a[3]
+
+
+def _merge_rects(rects):
+    """Merge overlapping rectangles into their bounding boxes"""
+    merged = [r for r in rects if r[2] > 0 and r[3] > 0]
+    changed = True
+    while changed:
+        changed = False
+        for i in range(len(merged)):
+            for j in range(i + 1, len(merged)):
+                if _intersects(merged[i], merged[j]):
+                    a, b = merged[i], merged[j]
+                    x = min(a[0], b[0])
+                    y = min(a[1], b[1])
+                    merged[i] = (x, y, max(a[0] + a[2], b[0] + b[2]) - x, max(a[1] + a[3], b[1] + b[3]) - y)
+                    del merged[j]
+                    changed = True
+                    break
+            if changed:
+                break
+    return merged
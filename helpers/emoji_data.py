@@ -1,6 +1,5 @@
 # Emoji definitions and configuration
-import badge
-import time
+from array import array
 
 EMOJIS = {
     "smile": {
@@ -31,7 +30,8 @@ EMOJIS = {
     "heart": {
         "name": "Heart",
         "button": "SW13",
-        "pbm_file": "assets/love.pbm"
+        "pbm_file": "assets/love.pbm",
+        "anim_file": "assets/anim/heart.anm"
     },
     "skull": {
         "name": "Skull",
@@ -47,6 +47,10 @@ EMOJIS = {
 
 EMOJI_ORDER = ["smile", "thumbs_up", "laugh", "rose", "peace", "heart", "skull", "poo"]
 
+# Buttons that step through received history on the received screen
+HISTORY_OLDER_BUTTON = "SW4"
+HISTORY_NEWER_BUTTON = "SW3"
+
 def get_button_map():
     """Generate button to emoji mapping"""
     button_map = {}
@@ -55,106 +59,111 @@ def get_button_map():
         button_map[button_name] = emoji_key
     return button_map
 
-class SoundManager:
-    def __init__(self, logger):
-        self.logger = logger
-    
-    def play_emoji_sound(self, emoji_key):
-        """Play buzzer sounds that *accurately* match the emoji's vibe."""
-        try:
-            b = badge.buzzer
-
-            if emoji_key == "smile":
-                # Bright, upbeat, sunshine vibe — major arpeggio + bounce
-                for _ in range(2):
-                    b.tone(523, 0.18)  # C5
-                    b.tone(659, 0.18)  # E5
-                    b.tone(784, 0.18)  # G5
-                    b.tone(1047, 0.25) # C6
-                    time.sleep(0.05)
-                    b.tone(784, 0.15)  # Bounce back down
+# Sounds as (frequency_hz, milliseconds) notes; frequency 0 is a rest.
+# (count, [notes...]) repeats a group. Flattened by get_melody() on first use.
+REST = 0
 
-            elif emoji_key == "thumbs_up":
-                # Short victory fanfare — confident & strong
-                b.tone(784, 0.15)   # G5
-                b.tone(988, 0.15)   # B5
-                b.tone(1175, 0.2)   # D6
-                b.tone(1319, 0.25)  # E6
-                time.sleep(0.05)
-                b.tone(1568, 0.3)   # G6 - punchy finish
+_MELODY_SPECS = {
+    # Bright, upbeat, sunshine vibe — major arpeggio + bounce
+    "smile": [
+        (2, [(523, 180),    # C5
+             (659, 180),    # E5
+             (784, 180),    # G5
+             (1047, 250),   # C6
+             (REST, 50),
+             (784, 150)]),  # Bounce back down
+    ],
+    # Short victory fanfare — confident & strong
+    "thumbs_up": [
+        (784, 150),    # G5
+        (988, 150),    # B5
+        (1175, 200),   # D6
+        (1319, 250),   # E6
+        (REST, 50),
+        (1568, 300),   # G6 - punchy finish
+    ],
+    # Rolling giggle — fast up/down pattern
+    "laugh": [
+        (3, [(784, 80),    # G5
+             (880, 80),    # A5
+             (784, 80),    # G5
+             (988, 100),   # B5
+             (REST, 30)]),
+        (659, 120),        # End with a little “heh”
+    ],
+    # Gentle romantic waltz — soft rise & fall
+    "rose": [
+        (392, 300),    # G4
+        (523, 350),    # C5
+        (659, 400),    # E5
+        (587, 250),    # D5
+        (REST, 50),
+        (784, 400),    # G5 (hold)
+    ],
+    # Calm meditation chime — spaced long notes
+    "peace": [
+        (440, 600),    # A4
+        (REST, 100),
+        (523, 700),    # C5
+        (REST, 150),
+        (659, 900),    # E5
+    ],
+    # Two heartbeat pulses — realistic lub-dub
+    "heart": [
+        (2, [(400, 120),   # Lub
+             (REST, 50),
+             (300, 180),   # Dub
+             (REST, 250)]),
+    ],
+    # Creepy toll — slow drop + rumble
+    "skull": [
+        (220, 400),    # Low toll
+        (REST, 50),
+        (196, 350),    # Slightly lower
+        (110, 500),    # Deep rumble
+    ],
+    # Comical fart-blip pattern
+    "poo": [
+        (2, [(300, 120),
+             (250, 100),
+             (180, 150),
+             (REST, 50),
+             (150, 200)]),  # Low bubbly end
+    ],
+    # Gentle chime for a received emoji
+    "notification": [
+        (800, 100),
+        (1000, 150),
+    ],
+}
 
-            elif emoji_key == "laugh":
-                # Rolling giggle — fast up/down pattern
-                for _ in range(3):
-                    b.tone(784, 0.08)   # G5
-                    b.tone(880, 0.08)   # A5
-                    b.tone(784, 0.08)   # G5
-                    b.tone(988, 0.1)    # B5
-                    time.sleep(0.03)
-                b.tone(659, 0.12)       # End with a little “heh”
 
-            elif emoji_key == "rose":
-                # Gentle romantic waltz — soft rise & fall
-                b.tone(392, 0.3)    # G4
-                b.tone(523, 0.35)   # C5
-                b.tone(659, 0.4)    # E5
-                b.tone(587, 0.25)   # D5
-                time.sleep(0.05)
-                b.tone(784, 0.4)    # G5 (hold)
+def _flatten(spec, out):
+    for item in spec:
+        if isinstance(item[1], list):
+            for _ in range(item[0]):
+                _flatten(item[1], out)
+        else:
+            out.append(item[0])
+            out.append(item[1])
+    return out
 
-            elif emoji_key == "peace":
-                # Calm meditation chime — spaced long notes
-                b.tone(440, 0.6)    # A4
-                time.sleep(0.1)
-                b.tone(523, 0.7)    # C5
-                time.sleep(0.15)
-                b.tone(659, 0.9)    # E5
 
-            elif emoji_key == "heart":
-                # Two heartbeat pulses — realistic lub-dub
-                for _ in range(2):
-                    b.tone(400, 0.12)   # Lub
-                    time.sleep(0.05)
-                    b.tone(300, 0.18)   # Dub
-                    time.sleep(0.25)
+def compile_melody(spec):
+    """Flatten a melody spec into a compact array of freq, ms pairs"""
+    return array("H", _flatten(spec, []))
 
-            elif emoji_key == "skull":
-                # Creepy toll — slow drop + rumble
-                b.tone(220, 0.4)    # Low toll
-                time.sleep(0.05)
-                b.tone(196, 0.35)   # Slightly lower
-                b.tone(110, 0.5)    # Deep rumble
 
-            elif emoji_key == "poo":
-                # Comical fart-blip pattern
-                for _ in range(2):
-                    b.tone(300, 0.12)
-                    b.tone(250, 0.1)
-                    b.tone(180, 0.15)
-                    time.sleep(0.05)
-                    b.tone(150, 0.2)  # Low bubbly end
+# Name -> array("H", [freq0, ms0, freq1, ms1, ...]), filled by get_melody()
+MELODIES = {}
 
-        except Exception as e:
-            self.logger.error(f"Buzzer error: {e}")
 
-    
-    def play_notification_sound(self):
-        """Play a gentle notification sound for received emojis"""
-        try:
-            # Simple notification chime
-            badge.buzzer.tone(800, 0.1)
-            badge.buzzer.tone(1000, 0.15)
-        except Exception as e:
-            self.logger.error(f"Notification sound error: {e}")
-    
-    def draw_test_pattern(self):
-        """Draw a simple test pattern when PBM files can't be loaded"""
-        center_x, center_y = 100, 90
-        
-        # Simple smiley face fallback
-        badge.display.rect(center_x - 30, center_y - 30, 60, 60, 0)
-        badge.display.fill_rect(center_x - 15, center_y - 10, 5, 5, 0)
-        badge.display.fill_rect(center_x + 10, center_y - 10, 5, 5, 0)
-        badge.display.hline(center_x - 15, center_y + 10, 30, 0)
-        badge.display.pixel(center_x - 16, center_y + 9, 0)
-        badge.display.pixel(center_x + 16, center_y + 9, 0)
+def get_melody(name):
+    """Return the compiled melody for a name, compiling it on first use, or None"""
+    notes = MELODIES.get(name)
+    if notes is None:
+        spec = _MELODY_SPECS.get(name)
+        if spec is None:
+            return None
+        notes = MELODIES[name] = compile_melody(spec)
+    return notes
@@ -0,0 +1,43 @@
+# Fixed-size history of received emoji, filled from the radio callback
+
+
+class Inbox:
+    """Ring buffer of (emoji_key, badge_id, timestamp, burst) records
+
+    push() is O(1) and never allocates beyond the record itself, so it is safe
+    to call from the packet callback. The oldest record is overwritten once
+    the buffer is full.
+    """
+
+    def __init__(self, capacity=16):
+        self.capacity = capacity
+        self._slots = [None] * capacity
+        self._head = 0      # Next slot to write
+        self._count = 0
+        self.pending = 0    # Records pushed since the last take_pending()
+        self.overflowed = 0  # Unseen records overwritten before being shown
+
+    def __len__(self):
+        return self._count
+
+    def push(self, emoji_key, badge_id, timestamp, burst=None):
+        self._slots[self._head] = (emoji_key, badge_id, timestamp, burst)
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        if self.pending < self.capacity:
+            self.pending += 1
+        else:
+            self.overflowed += 1
+
+    def get(self, age):
+        """Return the record age steps back from the newest (0 = newest), or None"""
+        if age < 0 or age >= self._count:
+            return None
+        return self._slots[(self._head - 1 - age) % self.capacity]
+
+    def take_pending(self):
+        """Return how many records arrived since the last call and reset the count"""
+        pending = self.pending
+        self.pending = 0
+        return pending
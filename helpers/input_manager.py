@@ -0,0 +1,137 @@
+# Edge-detecting, debounced button input with an event queue
+import badge
+
+# A button that just changed state ignores further changes for this long
+DEBOUNCE_TIME = 0.03
+
+# Poll quickly while the user is interacting, slowly once they have been idle
+POLL_ACTIVE = 0.02
+POLL_IDLE = 0.1
+IDLE_AFTER = 5.0
+
+MAX_EVENTS = 16
+
+EVENT_PRESS = 0
+EVENT_RELEASE = 1
+
+
+class InputManager:
+    """Turns button levels into press/release events
+
+    Button objects are resolved once. Each poll() reads only the buttons of
+    the active set into a bitmask, then finds edges and applies debounce for
+    all of them with a few integer operations.
+    """
+
+    def __init__(self, button_names, debounce=DEBOUNCE_TIME):
+        self.debounce = debounce
+
+        # Use the platform's bitmask read when every button is a bit index
+        buttons = []
+        for name in button_names:
+            button = getattr(badge.input.Buttons, name, None)
+            if button is not None:
+                buttons.append((name, button))
+        read_mask = getattr(badge.input, "get_buttons", None)
+        if read_mask and not all(isinstance(button, int) for _, button in buttons):
+            read_mask = None
+        self._read_mask = read_mask
+
+        # name -> (bit, button)
+        self._buttons = {}
+        for i, (name, button) in enumerate(buttons):
+            bit = 1 << button if read_mask else 1 << i
+            self._buttons[name] = (bit, button)
+
+        self._active = ()       # (name, bit, button) for the buttons being scanned
+        self._active_names = None
+        self._active_mask = 0
+        self._state = 0         # Debounced level of the active buttons
+        self._locked = 0        # Buttons inside their debounce window
+        self._lock_until = {}   # bit -> time the debounce window ends
+
+        self._events = []
+        self.dropped_events = 0
+        self.last_activity = badge.time.monotonic()
+
+    def has_button(self, name):
+        return name in self._buttons
+
+    def set_active(self, names):
+        """Scan only these buttons; those already held do not produce a press"""
+        if names is self._active_names:
+            return
+        self._active_names = names
+        self._active = tuple((name,) + self._buttons[name] for name in names if name in self._buttons)
+
+        mask = 0
+        for _, bit, _ in self._active:
+            mask |= bit
+        self._active_mask = mask
+        self._state = self._read() if mask else 0
+        self._locked &= mask
+        self._lock_until = {bit: until for bit, until in self._lock_until.items() if bit & mask}
+
+    def poll(self):
+        """Read the active buttons and queue an event for each debounced edge"""
+        if not self._active_mask:
+            return 0
+        now = badge.time.monotonic()
+        raw = self._read()
+
+        if self._locked:
+            for bit in [bit for bit in self._lock_until if self._locked & bit]:
+                if now >= self._lock_until[bit]:
+                    self._locked &= ~bit
+                    del self._lock_until[bit]
+
+        edges = (raw ^ self._state) & ~self._locked
+        if not edges:
+            return 0
+
+        self._state ^= edges
+        self._locked |= edges
+        self.last_activity = now
+        count = 0
+        for name, bit, _ in self._active:
+            if edges & bit:
+                self._lock_until[bit] = now + self.debounce
+                self._queue((EVENT_PRESS if raw & bit else EVENT_RELEASE, name, now))
+                count += 1
+        return count
+
+    def get_event(self):
+        """Return the oldest (kind, name, timestamp) event, or None"""
+        if self._events:
+            return self._events.pop(0)
+        return None
+
+    def clear(self):
+        self._events = []
+
+    def is_pressed(self, name):
+        entry = self._buttons.get(name)
+        return bool(entry and self._state & entry[0])
+
+    def next_poll_delay(self):
+        """Sleep time before the next poll: short while active, longer when idle"""
+        if badge.time.monotonic() - self.last_activity < IDLE_AFTER or self._state:
+            return POLL_ACTIVE
+        return POLL_IDLE
+
+    def _read(self):
+        if self._read_mask:
+            return self._read_mask() & self._active_mask
+        raw = 0
+        get_button = badge.input.get_button
+        for _, bit, button in self._active:
+            if get_button(button):
+                raw |= bit
+        return raw
+
+    def _queue(self, event):
+        if len(self._events) >= MAX_EVENTS:
+            # Keep the newest input; the oldest is least likely to still matter
+            self._events.pop(0)
+            self.dropped_events += 1
+        self._events.append(event)
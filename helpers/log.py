@@ -0,0 +1,94 @@
+# Level-gated logging for the helpers, with an in-memory ring buffer sink
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+ERROR = 40
+
+LEVEL_NAMES = {DEBUG: "debug", INFO: "info", WARNING: "warning", ERROR: "error"}
+
+
+class RingSink:
+    """Keeps the last `capacity` (level, message) entries instead of writing them out"""
+
+    def __init__(self, capacity=32):
+        self.capacity = capacity
+        self._entries = [None] * capacity
+        self._head = 0
+        self._count = 0
+        self.dropped = 0  # Entries overwritten before anyone read them
+
+    def __len__(self):
+        return self._count
+
+    def append(self, level, message):
+        self._entries[self._head] = (level, message)
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+        else:
+            self.dropped += 1
+
+    def entries(self):
+        """Return the held (level, message) entries, oldest first"""
+        start = (self._head - self._count) % self.capacity
+        return [self._entries[(start + i) % self.capacity] for i in range(self._count)]
+
+    def flush(self, logger):
+        """Write the held entries to a badge logger and empty the buffer"""
+        for level, message in self.entries():
+            getattr(logger, LEVEL_NAMES.get(level, "info"))(message)
+        self._count = 0
+        self.dropped = 0
+
+
+class Log:
+    """Logger facade taking %-style arguments
+
+    Messages below `level` return before any formatting happens, so callers
+    should pass values as arguments rather than building f-strings. With a
+    sink, messages below `write_through` only go to the sink; the rest are
+    written to the badge logger straight away. An error first writes out
+    what the sink holds, so the context leading up to it is not lost.
+    """
+
+    def __init__(self, logger, level=INFO, sink=None, write_through=WARNING):
+        self.logger = logger
+        self.level = level
+        self.sink = sink
+        self.write_through = write_through
+
+    def enabled(self, level):
+        return level >= self.level
+
+    def flush(self):
+        """Write buffered messages to the badge logger"""
+        if self.sink is not None and len(self.sink):
+            self.sink.flush(self.logger)
+
+    def debug(self, message, *args):
+        if DEBUG >= self.level:
+            self._emit(DEBUG, message, args)
+
+    def info(self, message, *args):
+        if INFO >= self.level:
+            self._emit(INFO, message, args)
+
+    def warning(self, message, *args):
+        if WARNING >= self.level:
+            self._emit(WARNING, message, args)
+
+    def error(self, message, *args):
+        if ERROR >= self.level:
+            self._emit(ERROR, message, args)
+
+    def _emit(self, level, message, args):
+        if args:
+            message = message % args
+        if self.sink is not None:
+            if level < self.write_through:
+                self.sink.append(level, message)
+                return
+            if level >= ERROR:
+                self.flush()
+        getattr(self.logger, LEVEL_NAMES[level])(message)
@@ -0,0 +1,113 @@
+# Binary wire format for emoji radio packets
+#
+#   byte 0  MAGIC
+#   byte 1  VERSION
+#   byte 2  flags
+#   byte 3  emoji index into emoji_data.EMOJI_ORDER
+#   byte 4  sequence number (only if flags & FLAG_SEQ)
+#
+# With FLAG_BURST the header is followed by an entry count and that many
+# (emoji index, count) byte pairs; byte 3 repeats the first entry so older
+# decoders still show something sensible.
+#
+# Legacy JSON packets ({"emoji": ..., "sender": ...}) are still accepted.
+from .emoji_data import EMOJI_ORDER
+
+MAGIC = 0xE5
+VERSION = 1
+HEADER_SIZE = 4
+
+# Flag bits
+FLAG_SEQ = 0x01    # A per-sender sequence number follows the header
+FLAG_BURST = 0x02  # Several emoji with counts, aggregated by the sender
+
+MAX_BURST_ENTRIES = 8
+
+EMOJI_INDEX = {key: index for index, key in enumerate(EMOJI_ORDER)}
+
+
+def encode_emoji(emoji_key, flags=0, seq=None):
+    """Encode an emoji selection as a binary packet"""
+    if seq is None:
+        return bytes((MAGIC, VERSION, flags, EMOJI_INDEX[emoji_key]))
+    return bytes((MAGIC, VERSION, flags | FLAG_SEQ, EMOJI_INDEX[emoji_key], seq & 0xFF))
+
+
+def encode_burst(entries, seq=None):
+    """Encode [(emoji_key, count), ...] as one burst packet"""
+    entries = entries[:MAX_BURST_ENTRIES]
+    out = [MAGIC, VERSION, FLAG_BURST, EMOJI_INDEX[entries[0][0]]]
+    if seq is not None:
+        out[2] |= FLAG_SEQ
+        out.append(seq & 0xFF)
+    out.append(len(entries))
+    for emoji_key, count in entries:
+        out.append(EMOJI_INDEX[emoji_key])
+        out.append(min(count, 255))
+    return bytes(out)
+
+
+def decode(data):
+    """Decode packet bytes into {'emoji', 'flags', 'seq', 'burst'}, or None if invalid
+
+    seq is None for packets sent without a sequence number. burst is a tuple
+    of (emoji_key, count) pairs for burst packets, otherwise None.
+    """
+    if len(data) >= HEADER_SIZE and data[0] == MAGIC:
+        # Newer versions only ever append fields, so the fixed header still parses
+        if data[1] < VERSION:
+            return None
+        flags = data[2]
+        index = data[3]
+        if index >= len(EMOJI_ORDER):
+            return None
+        pos = HEADER_SIZE
+        seq = None
+        if flags & FLAG_SEQ:
+            if len(data) < pos + 1:
+                return None
+            seq = data[pos]
+            pos += 1
+        burst = None
+        if flags & FLAG_BURST:
+            burst = _decode_burst(data, pos)
+            if burst is None:
+                return None
+        return {'emoji': EMOJI_ORDER[index], 'flags': flags, 'seq': seq, 'burst': burst}
+
+    if data[:1] == b'{':
+        return _decode_legacy(data)
+    return None
+
+
+def _decode_burst(data, pos):
+    if len(data) < pos + 1:
+        return None
+    count = data[pos]
+    end = pos + 1 + count * 2
+    if count == 0 or count > MAX_BURST_ENTRIES or len(data) < end:
+        return None
+    entries = []
+    for i in range(pos + 1, end, 2):
+        if data[i] >= len(EMOJI_ORDER):
+            return None
+        entries.append((EMOJI_ORDER[data[i]], data[i + 1]))
+    return tuple(entries)
+
+
+def _decode_legacy(data):
+    """Decode the original JSON format sent by older app versions"""
+    import json
+    try:
+        message = json.loads(bytes(data).decode('utf-8'))
+    except ValueError:
+        return None
+    if 'emoji' in message and 'sender' in message and message['emoji'] in EMOJI_INDEX:
+        return {'emoji': message['emoji'], 'flags': 0, 'seq': None, 'burst': None}
+    return None
+
+
+def encode_legacy(emoji_key, sender_handle):
+    """Encode the original JSON format, for badges that have not updated yet"""
+    import json
+    return json.dumps({'emoji': emoji_key, 'sender': sender_handle}).encode('utf-8')
@@ -1,101 +1,350 @@
+import os
+
+from . import emoji_data
+from .bitmap import PackedBitmap
+from .bundle import AssetBundle, BUNDLE_FILE
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+# Default byte budget for decoded images kept in memory
+DEFAULT_CACHE_BYTES = 32 * 1024
+
+_WHITESPACE = b' \t\r\n\x0b\x0c'
+
+
 class PBMParser:
-    def __init__(self, logger, app_name):
+    def __init__(self, logger, app_name, cache_bytes=DEFAULT_CACHE_BYTES):
         self.logger = logger
         self.app_name = app_name
-    
+        self.base_dir = f"/apps/{app_name}"
+
+        # Packed emoji bitmaps, opened on first use; emoji missing from it
+        # (or every emoji, without a current bundle) are read from their PBM files
+        self.bundle_file = BUNDLE_FILE
+        self.bundle = None
+        self._bundle_checked = False
+
+        # Decoded-image LRU cache: filename -> (stamp, size, width, height, bitmap)
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cache_used = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_evictions = 0
+
     def parse_pbm_file(self, filename):
-        """Parse a PBM file and return width, height, and pixel data array"""
+        """Parse a PBM file and return width, height, and a PackedBitmap"""
         try:
-            file_path = f"/apps/{self.app_name}/{filename}"
-            self.logger.info(f"Opening PBM file at: {file_path}")
-            
-            # Try ASCII format first
-            try:
-                with open(file_path, 'r') as f:
-                    file_content = f.readlines()
-                self.logger.info(f"Successfully opened PBM file as text from: {file_path}")
-                return self._parse_ascii_pbm(file_content)
-            except (OSError, ValueError) as e:
-                # Try binary format
-                self.logger.info(f"Text reading failed ({e}), trying binary format for: {file_path}")
-                try:
-                    with open(file_path, 'rb') as f:
-                        file_content = f.read()
-                    return self._parse_binary_pbm(file_content)
-                except Exception as binary_error:
-                    self.logger.error(f"Binary reading also failed: {binary_error}")
-                    raise
-            
+            file_path = f"{self.base_dir}/{filename}"
+            stamp = self._file_stamp(file_path)
+
+            cached = self._cache_get(filename, stamp)
+            if cached is not None:
+                return cached
+
+            self.cache_misses += 1
+            width, height, bitmap = self._load_pbm_file(file_path)
+            self._cache_put(filename, stamp, width, height, bitmap)
+            return width, height, bitmap
+
         except Exception as e:
-            self.logger.error(f"Error parsing PBM file {filename}: {e}")
+            self.logger.error("Error parsing PBM file %s: %s", filename, e)
             return None, None, None
-    
+
+    def parse_emoji(self, emoji_key):
+        """Return width, height and a PackedBitmap for an emoji, from the bundle when possible"""
+        bundle = self.open_bundle()
+        if bundle is None or emoji_key not in bundle:
+            return self.parse_pbm_file(emoji_data.EMOJIS[emoji_key]["pbm_file"])
+
+        try:
+            # The bundle was stamped when opened, so a hit needs no filesystem call
+            cached = self._cache_get(emoji_key, bundle.stamp)
+            if cached is not None:
+                return cached
+
+            self.cache_misses += 1
+            width, height, data = bundle.read(emoji_key)
+            if not bundle.stable_views:
+                data = bytearray(data)
+            bitmap = PackedBitmap(width, height, data)
+            self._cache_put(emoji_key, bundle.stamp, width, height, bitmap)
+            return width, height, bitmap
+
+        except Exception as e:
+            self.logger.error("Error reading %s from bundle: %s", emoji_key, e)
+            return None, None, None
+
+    def open_bundle(self):
+        """Return the AssetBundle, opening it on first call, or None if there is none
+
+        A bundle older than the PBM files it was built from is not used.
+        """
+        if not self._bundle_checked:
+            self._bundle_checked = True
+            if self.bundle_file:
+                try:
+                    bundle = AssetBundle(f"{self.base_dir}/{self.bundle_file}")
+                    if self._bundle_current(bundle):
+                        self.bundle = bundle
+                    else:
+                        bundle.close()
+                        self.logger.info("PBM files changed since the asset bundle was built, using PBM files")
+                except (OSError, ValueError) as e:
+                    self.logger.info("No asset bundle, using PBM files: %s", e)
+        return self.bundle
+
+    def _bundle_current(self, bundle):
+        """Check the bundle against the PBM files it was built from"""
+        paths = []
+        for key in bundle.keys:
+            item = emoji_data.EMOJIS.get(key)
+            if item is None:
+                return False
+            paths.append(f"{self.base_dir}/{item['pbm_file']}")
+        try:
+            return bundle.check_sources(paths)
+        except OSError:
+            return False
+
+    def open_pbm_stream(self, filename):
+        """Open a P4 file for row-by-row decoding without loading it into memory"""
+        return PBMRowStream(f"{self.base_dir}/{filename}")
+
+    def _load_pbm_file(self, file_path):
+        """Read a PBM file with a single open and decode it"""
+        with open(file_path, 'rb') as f:
+            file_content = f.read()
+        return self.parse_pbm_bytes(file_content)
+
+    def parse_pbm_bytes(self, file_content):
+        """Decode in-memory PBM data, dispatching on the P1/P4 magic number"""
+        magic = bytes(file_content[:2])
+        if magic == b'P4':
+            width, height, bitmap = self._parse_binary_pbm(file_content)
+        elif magic == b'P1':
+            width, height, bitmap = self._parse_ascii_pbm(file_content)
+        else:
+            raise ValueError(f"Not a valid PBM file - magic number is {magic}")
+
+        self.logger.debug("Loaded P%c PBM: %dx%d", magic[1], width, height)
+        return width, height, bitmap
+
+    def _file_stamp(self, file_path):
+        """Return (mtime, size) used to detect changed files without opening them"""
+        st = os.stat(file_path)
+        return (st[8], st[6])
+
+    def _cache_get(self, filename, stamp):
+        """Return cached (width, height, bitmap) if still valid, else None"""
+        entry = self._cache.get(filename)
+        if entry is None:
+            return None
+
+        if entry[0] != stamp:
+            # File changed on disk - drop the stale image
+            self._cache_remove(filename)
+            return None
+
+        # Move to most-recently-used position
+        self._cache.pop(filename)
+        self._cache[filename] = entry
+        self.cache_hits += 1
+        return entry[2], entry[3], entry[4]
+
+    def _cache_put(self, filename, stamp, width, height, bitmap):
+        """Insert a decoded image, evicting least-recently-used entries over budget"""
+        size = self._image_size(width, height, bitmap)
+        if size > self.cache_bytes:
+            return
+
+        if filename in self._cache:
+            self._cache_remove(filename)
+
+        while self._cache and self._cache_used + size > self.cache_bytes:
+            oldest = next(iter(self._cache))
+            self._cache_remove(oldest)
+            self.cache_evictions += 1
+
+        self._cache[filename] = (stamp, size, width, height, bitmap)
+        self._cache_used += size
+
+    def _cache_remove(self, filename):
+        entry = self._cache.pop(filename)
+        self._cache_used -= entry[1]
+
+    def _image_size(self, width, height, bitmap):
+        """Memory cost of a decoded image in bytes"""
+        return bitmap.nbytes
+
+    def clear_cache(self):
+        """Drop all cached images"""
+        self._cache = OrderedDict()
+        self._cache_used = 0
+
+    def cache_stats(self):
+        """Return cache hit/miss/eviction counters and current usage"""
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'evictions': self.cache_evictions,
+            'entries': len(self._cache),
+            'bytes': self._cache_used,
+            'budget': self.cache_bytes
+        }
+
     def _parse_ascii_pbm(self, file_content):
-        """Parse ASCII PBM format (P1)"""
-        # Remove comments and empty lines
-        clean_lines = []
-        for line in file_content:
-            line = line.strip()
-            if line and not line.startswith('#'):
-                clean_lines.append(line)
-        
-        if len(clean_lines) < 3:
-            raise ValueError("Invalid PBM file format")
-        
-        if not clean_lines[0].startswith('P1'):
-            raise ValueError(f"Not a valid ASCII PBM file - magic number is {clean_lines[0]}")
-        
-        width, height = map(int, clean_lines[1].split())
-        self.logger.info(f"PBM dimensions: {width}x{height}")
-        
-        # Get pixel data
-        pixel_data = []
-        for line in clean_lines[2:]:
-            for char in line:
-                if char in '01':
-                    pixel_data.append(int(char))
-        
-        if len(pixel_data) != width * height:
-            while len(pixel_data) < width * height:
-                pixel_data.append(0)
-        
-        return width, height, pixel_data
-    
+        """Parse ASCII PBM format (P1) into the same packed layout as P4"""
+        width, height, idx = parse_pbm_header(file_content)
+
+        # Pack pixel digits straight into rows; missing pixels stay white
+        bitmap = PackedBitmap(width, height)
+        x = y = 0
+        end = len(file_content)
+        while idx < end and y < height:
+            char = file_content[idx]
+            if char == 0x31 or char == 0x30:  # '1' / '0'
+                if char == 0x31:
+                    bitmap.set_pixel(x, y, 1)
+                x += 1
+                if x == width:
+                    x = 0
+                    y += 1
+            elif char == 0x23:  # '#' comment runs to end of line
+                while idx < end and file_content[idx] not in b'\r\n':
+                    idx += 1
+            idx += 1
+
+        return width, height, bitmap
+
     def _parse_binary_pbm(self, file_content):
         """Parse binary PBM format (P4)"""
-        # Find header end
-        header_lines = []
-        idx = 0
-        while len(header_lines) < 2:
-            eol = file_content.find(b'\n', idx)
-            if eol == -1:
-                raise ValueError("Invalid PBM file: no newline found")
-            line = file_content[idx:eol].strip()
-            idx = eol + 1
-            if line and not line.startswith(b'#'):
-                header_lines.append(line.decode('ascii'))
-
-        if header_lines[0] != 'P4':
-            raise ValueError(f"Not a valid binary PBM file - magic number is {header_lines[0]}")
-
-        width, height = map(int, header_lines[1].split())
-        self.logger.info(f"Binary PBM dimensions: {width}x{height}")
-
-        # Parse binary pixel data
-        binary_data = file_content[idx:]
-        pixels_2d = []
-
-        row_bytes = (width + 7) // 8
-        for y in range(height):
-            row_bits = []
-            row_start = y * row_bytes
-            row_end = row_start + row_bytes
-            for byte in binary_data[row_start:row_end]:
-                for bit in range(8):
-                    if len(row_bits) >= width:
-                        break
-                    pixel = (byte >> (7 - bit)) & 1
-                    row_bits.append(pixel)
-            pixels_2d.append(row_bits)
-
-        return width, height, pixels_2d
+        width, height, idx = parse_pbm_header(file_content)
+
+        # Wrap the packed rows in place - P4 data is already the bitmap layout
+        return width, height, PackedBitmap(width, height, memoryview(file_content)[idx:])
+
+
+class PBMRowStream:
+    """Decodes a P4 image one packed row at a time
+
+    Memory use is one row plus a small read buffer regardless of image size,
+    so full-screen artwork can be drawn straight from storage.
+    """
+
+    def __init__(self, file_path, buffer_size=32):
+        self._file = open(file_path, 'rb')
+        self._buf = bytearray(buffer_size)
+        self._pos = 0
+        self._len = 0
+        try:
+            self.width, self.height = self._read_header()
+        except Exception:
+            self.close()
+            raise
+        self.stride = (self.width + 7) // 8
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def close(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def rows(self):
+        """Yield every row as a memoryview; the buffer is reused, so copy rows you keep"""
+        row = bytearray(self.stride)
+        view = memoryview(row)
+        for _ in range(self.height):
+            filled = 0
+
+            # Raster bytes already pulled in with the header come first
+            avail = self._len - self._pos
+            if avail > 0:
+                filled = min(avail, self.stride)
+                row[0:filled] = self._buf[self._pos:self._pos + filled]
+                self._pos += filled
+
+            while filled < self.stride:
+                got = self._file.readinto(view[filled:])
+                if not got:
+                    raise ValueError("Truncated PBM raster")
+                filled += got
+            yield view
+
+    def _next_byte(self):
+        if self._pos >= self._len:
+            self._len = self._file.readinto(self._buf)
+            self._pos = 0
+            if not self._len:
+                raise ValueError("Truncated PBM header")
+        char = self._buf[self._pos]
+        self._pos += 1
+        return char
+
+    def _read_header(self):
+        """Parse 'P4 width height' from the stream, leaving it at the raster"""
+        if self._next_byte() != 0x50 or self._next_byte() != 0x34:
+            raise ValueError("Not a binary PBM (P4) file")
+
+        values = []
+        char = self._next_byte()
+        while len(values) < 2:
+            if char == 0x23:  # '#' comment runs to end of line
+                while char != 0x0a and char != 0x0d:
+                    char = self._next_byte()
+            elif char in _WHITESPACE:
+                char = self._next_byte()
+            elif 0x30 <= char <= 0x39:
+                value = 0
+                while 0x30 <= char <= 0x39:
+                    value = value * 10 + char - 0x30
+                    char = self._next_byte()
+                values.append(value)
+            else:
+                raise ValueError("Invalid PBM header")
+
+        # The byte after the height is the single separator before the raster
+        if char not in _WHITESPACE:
+            raise ValueError("Invalid PBM header: missing raster separator")
+        return values[0], values[1]
+
+
+def parse_pbm_header(data):
+    """Parse a PBM header; return (width, height, offset of the first raster byte)
+
+    Fields may be separated by any whitespace and interleaved with # comments.
+    Exactly one whitespace byte separates the header from the raster.
+    """
+    end = len(data)
+    idx = 2
+    values = []
+    while len(values) < 2:
+        # Skip whitespace and comment lines
+        while idx < end:
+            char = data[idx]
+            if char == 0x23:
+                while idx < end and data[idx] not in b'\r\n':
+                    idx += 1
+            elif char in _WHITESPACE:
+                idx += 1
+            else:
+                break
+
+        start = idx
+        while idx < end and 0x30 <= data[idx] <= 0x39:
+            idx += 1
+        if idx == start:
+            raise ValueError("Invalid PBM header")
+        values.append(int(bytes(data[start:idx]).decode()))
+
+    if idx >= end or data[idx] not in _WHITESPACE:
+        raise ValueError("Invalid PBM header: missing raster separator")
+    return values[0], values[1], idx + 1
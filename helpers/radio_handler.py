@@ -1,53 +1,235 @@
 import badge
-import json
+
+from . import packet_codec
+
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+# Duplicate suppression: a repeated sequence number (or identical legacy
+# payload) from the same badge within this many seconds is dropped
+DEDUP_WINDOW = 10
+DEDUP_HISTORY = 8
+
+# Per-sender token bucket: short bursts allowed, then one packet per refill period
+RATE_BURST = 3
+RATE_REFILL_PER_SEC = 0.5
+
+# Senders tracked at once; the least recently heard is forgotten first
+MAX_TRACKED_SENDERS = 32
+
+# Contact handle cache: lookups hit storage, and the same badges send repeatedly
+HANDLE_CACHE_TTL = 300
+HANDLE_CACHE_SIZE = 64
+
+# Sender-side aggregation: the first selection goes out at once, later ones
+# within this many seconds are sent together as one burst packet. One packet
+# per window must not outpace the receivers' token refill, or whole bursts
+# are dropped as rate limited
+BURST_WINDOW = 1 / RATE_REFILL_PER_SEC
 
 class RadioHandler:
-    def __init__(self, logger):
+    def __init__(self, logger, send_legacy=False, handle_ttl=HANDLE_CACHE_TTL,
+                 handle_cache_size=HANDLE_CACHE_SIZE):
         self.logger = logger
-    
+
+        # Send the old JSON format while badges without the binary decoder remain
+        self.send_legacy = send_legacy
+        self._seq = 0
+
+        # Selections waiting for the burst window to close, as [emoji_key, count]
+        self.burst_window = BURST_WINDOW
+        self._burst = []
+        self._burst_until = 0
+
+        # badge_id -> [tokens, last_refill_time, [(dedup_key, time), ...]]
+        self._senders = OrderedDict()
+
+        # (emoji, badge_id, burst) currently shown; repeats of it are coalesced
+        self._delivered = None
+
+        # badge_id -> (handle, expiry time), least recently used first
+        self.handle_ttl = handle_ttl
+        self.handle_cache_size = handle_cache_size
+        self._handles = OrderedDict()
+        self._my_handle = None
+
+        self.stats = {
+            'received': 0,
+            'delivered': 0,
+            'invalid': 0,
+            'duplicates': 0,
+            'rate_limited': 0,
+            'coalesced': 0,
+            'handle_hits': 0,
+            'handle_misses': 0,
+            'sent_selections': 0,
+            'sent_packets': 0
+        }
+
     def broadcast_emoji(self, emoji_key):
-        """Broadcast selected emoji to all nearby badges"""
+        """Broadcast selected emoji to all nearby badges
+
+        Selections made shortly after a send are held back and flushed by
+        tick() as one burst packet.
+        """
+        self.stats['sent_selections'] += 1
+        if self.send_legacy:
+            self._send(packet_codec.encode_legacy(emoji_key, self.my_handle()), emoji_key)
+            return
+
+        now = badge.time.monotonic()
+        if now < self._burst_until:
+            for entry in self._burst:
+                if entry[0] == emoji_key:
+                    entry[1] += 1
+                    return
+            self._burst.append([emoji_key, 1])
+            return
+
+        self._send(packet_codec.encode_emoji(emoji_key, seq=self._next_seq()), emoji_key)
+        self._burst_until = now + self.burst_window
+
+    def tick(self):
+        """Flush held-back selections once the burst window has closed"""
+        if not self._burst or badge.time.monotonic() < self._burst_until:
+            return
+
+        entries = self._burst
+        self._burst = []
+        if len(entries) == 1 and entries[0][1] == 1:
+            message_data = packet_codec.encode_emoji(entries[0][0], seq=self._next_seq())
+        else:
+            message_data = packet_codec.encode_burst(entries, seq=self._next_seq())
+        self._send(message_data, entries)
+
+        # Keep batching while selections keep coming
+        self._burst_until = badge.time.monotonic() + self.burst_window
+
+    def pending_burst(self):
+        """Number of selections waiting to be flushed by tick()"""
+        return sum(count for _, count in self._burst)
+
+    def _next_seq(self):
+        self._seq = (self._seq + 1) & 0xFF
+        return self._seq
+
+    def _send(self, message_data, description):
         try:
-            # Get our contact info for the sender field
-            my_contact = badge.contacts.my_contact()
-            sender_handle = my_contact.handle if my_contact and my_contact.handle else "Unknown"
-            
-            # Create emoji broadcast message
-            emoji_message = {
-                'emoji': emoji_key,
-                'sender': sender_handle
-            }
-            
-            # Convert to JSON and encode as bytes
-            message_data = json.dumps(emoji_message).encode('utf-8')
-            
-            # Broadcast to all badges (dest=0 means broadcast)
+            # Broadcast to all badges; receivers identify the sender by packet.source
             badge.radio.send_packet(0xffff, message_data)
-            self.logger.info(f"Broadcasted emoji '{emoji_key}' from {sender_handle}")
-            
+            self.stats['sent_packets'] += 1
+            self.logger.debug("Broadcasted emoji %s (%d bytes)", description, len(message_data))
+
         except Exception as e:
-            self.logger.error(f"Error broadcasting emoji: {e}")
-    
-    def handle_packet(self, packet):
-        """Process incoming radio packet and return decoded emoji data"""
+            self.logger.error("Error broadcasting emoji: %s", e)
+
+    def receive(self, packet):
+        """Decode and filter a packet; return (emoji_key, badge_id, burst) or None
+
+        Cheap enough for the packet callback: no contact lookup happens here.
+        Invalid, duplicate, rate-limited and coalesced packets return None, so
+        only a change of what should be on screen reaches the caller.
+        """
         try:
-            # Decode the emoji data
-            emoji_data = json.loads(packet.data.decode('utf-8'))
-            
-            # Validate the packet format
-            if 'emoji' in emoji_data and 'sender' in emoji_data:
-                # Get sender contact info
-                sender_contact = badge.contacts.get_contact_by_badge_id(packet.source)
-                sender_name = sender_contact.handle if sender_contact and sender_contact.handle else f"Badge {packet.source:04X}"
-                
-                # Return processed emoji data
-                return {
-                    'emoji': emoji_data['emoji'],
-                    'sender': sender_name,
-                    'badge_id': packet.source
-                }
-                
+            self.stats['received'] += 1
+
+            # Decode the emoji data (binary, or JSON from older badges)
+            message = packet_codec.decode(packet.data)
+            if not message:
+                self.stats['invalid'] += 1
+                self.logger.debug("Dropped invalid packet from %04X", packet.source)
+                return None
+
+            badge_id = packet.source
+            if not self._admit(badge_id, message, packet.data):
+                return None
+
+            # Same emoji from the same badge as the one on screen: nothing to redraw
+            delivered = (message['emoji'], badge_id, message['burst'])
+            if delivered == self._delivered:
+                self.stats['coalesced'] += 1
+                return None
+            self._delivered = delivered
+            self.stats['delivered'] += 1
+            return delivered
+
         except Exception as e:
-            self.logger.error(f"Error handling radio packet: {e}")
-            
+            self.logger.error("Error handling radio packet: %s", e)
+
         return None
+
+    def resolve_sender(self, badge_id):
+        """Return the display handle for a badge, from cache when possible"""
+        now = badge.time.monotonic()
+        entry = self._handles.pop(badge_id, None)
+        if entry is not None and now < entry[1]:
+            self._handles[badge_id] = entry
+            self.stats['handle_hits'] += 1
+            return entry[0]
+
+        self.stats['handle_misses'] += 1
+
+        # Get sender contact info
+        sender_contact = badge.contacts.get_contact_by_badge_id(badge_id)
+        handle = sender_contact.handle if sender_contact and sender_contact.handle else f"Badge {badge_id:04X}"
+
+        if self.handle_cache_size > 0:
+            while len(self._handles) >= self.handle_cache_size:
+                del self._handles[next(iter(self._handles))]
+            self._handles[badge_id] = (handle, now + self.handle_ttl)
+        return handle
+
+    def my_handle(self):
+        """Return our own handle, looked up once until contacts change"""
+        if self._my_handle is None:
+            # Get our contact info for the sender field
+            my_contact = badge.contacts.my_contact()
+            self._my_handle = my_contact.handle if my_contact and my_contact.handle else "Unknown"
+        return self._my_handle
+
+    def invalidate_contacts(self):
+        """Drop cached handles; call when the contact list may have changed"""
+        self._handles = OrderedDict()
+        self._my_handle = None
+
+    def handle_hit_rate(self):
+        lookups = self.stats['handle_hits'] + self.stats['handle_misses']
+        return self.stats['handle_hits'] / lookups if lookups else 0.0
+
+    def forget_delivered(self):
+        """Call when the received emoji leaves the screen so a repeat shows again"""
+        self._delivered = None
+
+    def _admit(self, badge_id, message, data):
+        """Apply duplicate suppression and the sender's rate limit"""
+        now = badge.time.monotonic()
+        state = self._senders.pop(badge_id, None)
+        if state is None:
+            state = [RATE_BURST, now, []]
+            if len(self._senders) >= MAX_TRACKED_SENDERS:
+                # Senders are re-inserted when heard, so the first is the stalest
+                del self._senders[next(iter(self._senders))]
+        self._senders[badge_id] = state
+
+        # Sequence number when present, else the raw legacy payload
+        dedup_key = message['seq'] if message['seq'] is not None else bytes(data)
+        recent = [entry for entry in state[2] if now - entry[1] < DEDUP_WINDOW]
+        for key, _ in recent:
+            if key == dedup_key:
+                state[2] = recent
+                self.stats['duplicates'] += 1
+                return False
+        recent.append((dedup_key, now))
+        state[2] = recent[-DEDUP_HISTORY:]
+
+        # Token bucket
+        tokens = min(RATE_BURST, state[0] + (now - state[1]) * RATE_REFILL_PER_SEC)
+        state[1] = now
+        if tokens < 1:
+            state[0] = tokens
+            self.stats['rate_limited'] += 1
+            return False
+        state[0] = tokens - 1
+        return True
@@ -0,0 +1,131 @@
+# Persistent log of emoji received while the app is in the background
+import struct
+
+from .packet_codec import EMOJI_INDEX, MAX_BURST_ENTRIES
+from .emoji_data import EMOJI_ORDER
+
+LOG_FILE = "received.bin"
+LOG_MAGIC = b"EJRL"
+LOG_VERSION = 1
+DEFAULT_CAPACITY = 32
+
+KIND_SINGLE = 0
+KIND_BURST = 1
+UNKNOWN_EMOJI = 0xFF
+
+_HEADER = "<4sBBHHH"  # magic, version, record size, capacity, next slot, unread count
+_RECORD = "<HBB%ds" % (2 * MAX_BURST_ENTRIES)  # badge id, kind, entry count, (emoji index, count) pairs
+_HEADER_SIZE = struct.calcsize(_HEADER)
+_RECORD_SIZE = struct.calcsize(_RECORD)
+
+
+class ReceiveLog:
+    """Ring of fixed-size records in one preallocated file
+
+    Appending writes one record and the header in place, so the file never
+    grows and a packet costs two small writes. The file is created by the
+    first append(), so a launch with nothing received never writes it.
+    Records are kept until they are overwritten; drain() returns the ones
+    not seen yet.
+    """
+
+    def __init__(self, logger, app_name, capacity=DEFAULT_CAPACITY):
+        self.logger = logger
+        self.path = f"/apps/{app_name}/{LOG_FILE}"
+        self.capacity = capacity
+
+        # Header fields, read from the file on first use
+        self._next = None
+        self.unread = 0
+
+    def append(self, emoji_key, badge_id, burst=None):
+        """Record a received emoji (or burst of (emoji_key, count) pairs)"""
+        try:
+            if self._next is None:
+                self._open()
+            if burst:
+                kind = KIND_BURST
+                entries = burst[:MAX_BURST_ENTRIES]
+            else:
+                kind = KIND_SINGLE
+                entries = ((emoji_key, 1),)
+            pairs = bytearray()
+            for key, count in entries:
+                pairs.append(EMOJI_INDEX.get(key, UNKNOWN_EMOJI))
+                pairs.append(min(count, 255))
+            record = struct.pack(_RECORD, badge_id & 0xFFFF, kind, len(entries), pairs)
+
+            slot = self._next
+            self._next = (slot + 1) % self.capacity
+            self.unread = min(self.unread + 1, self.capacity)
+            with open(self.path, "r+b") as f:
+                f.seek(_HEADER_SIZE + slot * _RECORD_SIZE)
+                f.write(record)
+                f.seek(0)
+                f.write(self._header())
+        except Exception as e:
+            self.logger.error("Receive log write failed: %s", e)
+
+    def drain(self):
+        """Return unread records as (emoji_key, badge_id, burst), oldest first, and mark them read"""
+        if self._next is None and not self._open(create=False):
+            return []
+        if not self.unread:
+            return []
+
+        records = []
+        try:
+            with open(self.path, "r+b") as f:
+                first = (self._next - self.unread) % self.capacity
+                for i in range(self.unread):
+                    f.seek(_HEADER_SIZE + (first + i) % self.capacity * _RECORD_SIZE)
+                    records.append(_unpack_record(f.read(_RECORD_SIZE)))
+                self.unread = 0
+                f.seek(0)
+                f.write(self._header())
+        except Exception as e:
+            self.logger.error("Receive log read failed: %s", e)
+        return records
+
+    def _open(self, create=True):
+        """Read the header; True once it is loaded
+        
+        A missing or incompatible file is created (or recreated) if create is
+        set, and otherwise left alone.
+        """
+        try:
+            with open(self.path, "rb") as f:
+                magic, version, record_size, capacity, next_slot, unread = struct.unpack(
+                    _HEADER, f.read(_HEADER_SIZE))
+            if (magic == LOG_MAGIC and version == LOG_VERSION and record_size == _RECORD_SIZE
+                    and capacity == self.capacity and next_slot < capacity):
+                self._next = next_slot
+                self.unread = min(unread, capacity)
+                return True
+        except (OSError, ValueError, struct.error):
+            pass
+        if not create:
+            return False
+
+        self.logger.info("Creating receive log at %s", self.path)
+        self._next = 0
+        self.unread = 0
+        with open(self.path, "wb") as f:
+            f.write(self._header())
+            f.write(bytes(_RECORD_SIZE * self.capacity))
+        return True
+
+    def _header(self):
+        return struct.pack(_HEADER, LOG_MAGIC, LOG_VERSION, _RECORD_SIZE, self.capacity,
+                           self._next, self.unread)
+
+
+def _unpack_record(data):
+    badge_id, kind, count, pairs = struct.unpack(_RECORD, data)
+    entries = []
+    for i in range(count):
+        index = pairs[2 * i]
+        key = EMOJI_ORDER[index] if index < len(EMOJI_ORDER) else None
+        entries.append((key, pairs[2 * i + 1]))
+    burst = tuple(entries) if kind == KIND_BURST else None
+    return entries[0][0] if entries else None, badge_id, burst
@@ -0,0 +1,164 @@
+# Run-length bitmap renderer for the badge display
+from .bitmap import row_runs
+
+try:
+    import framebuf
+except ImportError:
+    framebuf = None
+
+
+class BitmapRenderer:
+    """Draws PackedBitmaps as horizontal runs instead of individual pixels"""
+
+    def __init__(self, display):
+        self.display = display
+        self.calls = 0  # Display primitive calls issued since last reset
+
+        # Pre-scaled sprites can be copied in one call when the display is a FrameBuffer
+        self.can_blit = framebuf is not None and hasattr(display, "blit")
+        self.can_snapshot = self.can_blit
+
+    def reset_calls(self):
+        self.calls = 0
+
+    def snapshot(self):
+        """Copy the whole display into a FrameBuffer, or None if unsupported"""
+        if not self.can_snapshot:
+            return None
+        display = self.display
+        try:
+            buf = bytearray(((display.width + 7) // 8) * display.height)
+            frame = framebuf.FrameBuffer(buf, display.width, display.height, framebuf.MONO_HLSB)
+            frame.blit(display, 0, 0)
+            return frame
+        except (TypeError, ValueError):
+            # The display is not a FrameBuffer and cannot be used as a blit source
+            self.can_snapshot = False
+            return None
+
+    def capture(self, x, y, width, height, buf=None):
+        """Copy a screen region into a (FrameBuffer, buffer), or None if unsupported
+
+        buf, when given, is reused instead of allocating one; it must hold the region.
+        """
+        if not self.can_snapshot:
+            return None
+        try:
+            if buf is None:
+                buf = bytearray(((width + 7) // 8) * height)
+            frame = framebuf.FrameBuffer(buf, width, height, framebuf.MONO_HLSB)
+            frame.blit(self.display, -x, -y)
+            return frame, buf
+        except (TypeError, ValueError):
+            self.can_snapshot = False
+            return None
+
+    def restore(self, frame):
+        """Put a snapshot taken with snapshot() back on the display in one call"""
+        self.display.blit(frame, 0, 0)
+        self.calls += 1
+
+    def draw_sprite(self, sprite, dx=0, dy=0):
+        """Draw a pre-scaled atlas sprite, offset by (dx, dy), blitting it when the display allows"""
+        if self.can_blit:
+            if sprite.frame is None:
+                bitmap = sprite.bitmap
+                sprite.frame = framebuf.FrameBuffer(bitmap.data, bitmap.width, bitmap.height,
+                                                    framebuf.MONO_HLSB)
+            self.display.blit(sprite.frame, sprite.x + dx, sprite.y + dy)
+            self.calls += 1
+        else:
+            # Sprites are stored in display polarity, so black is a clear bit
+            self.draw(sprite.bitmap, sprite.x + dx, sprite.y + dy, value=0)
+
+    def draw_frame_box(self, frame, width, box, x, y):
+        """Copy a byte-aligned box of a display-polarity frame to the screen
+
+        frame holds packed rows for an image width pixels wide placed at (x, y);
+        box is (first byte column, first row, byte columns, rows).
+        """
+        col, row, cols, rows = box
+        stride = (width + 7) // 8
+        box_x = x + col * 8
+        box_w = min(cols * 8, width - col * 8)
+        start = row * stride + col
+        if self.can_blit:
+            # A view with the frame's stride, so nothing is copied
+            view = framebuf.FrameBuffer(memoryview(frame)[start:], box_w, rows, framebuf.MONO_HLSB, stride * 8)
+            self.display.blit(view, box_x, y + row)
+            self.calls += 1
+        else:
+            self.display.fill_rect(box_x, y + row, box_w, rows, 1)
+            self.calls += 1
+            packed = (frame[start + r * stride:start + r * stride + cols] for r in range(rows))
+            self.draw_rows(packed, box_w, rows, box_x, y + row, value=0)
+        return box_x, y + row, box_w, rows
+
+    def draw(self, bitmap, x, y, scale=1, color=0, value=1):
+        """Draw the pixels of bitmap equal to value with its top-left corner at (x, y)"""
+        rows = (bitmap.row(r) for r in range(bitmap.height))
+        self.draw_rows(rows, bitmap.width, bitmap.height, x, y, scale, color, value)
+
+    def draw_rows(self, rows, width, height, x, y, scale=1, color=0, value=1):
+        """Draw an image supplied as an iterator of packed rows (e.g. a PBMRowStream)
+
+        Each row is converted to runs as soon as it arrives, so the iterator may
+        reuse one buffer for every row.
+        """
+        display = self.display
+        disp_w = display.width
+        disp_h = display.height
+
+        # Clip once per image: visible source rows and whether columns need clamping
+        first_row = 0 if y >= 0 else (-y) // scale
+        last_row = min(height, (disp_h - y + scale - 1) // scale)
+        if first_row >= last_row or x >= disp_w or x + width * scale <= 0:
+            return
+        clip_x = x < 0 or x + width * scale > disp_w
+
+        # Identical consecutive rows are merged into one taller rectangle
+        band_runs = None
+        band_start = first_row
+        row = 0
+        for packed in rows:
+            if row >= last_row:
+                break
+            if row >= first_row:
+                runs = list(row_runs(packed, width, value))
+                if runs != band_runs:
+                    if band_runs:
+                        self._fill_band(band_runs, x, y, scale, band_start, row, clip_x, color)
+                    band_runs = runs
+                    band_start = row
+            row += 1
+        if band_runs:
+            self._fill_band(band_runs, x, y, scale, band_start, row, clip_x, color)
+
+    def _fill_band(self, runs, x, y, scale, row_start, row_end, clip_x, color):
+        """Fill every run across source rows [row_start, row_end)"""
+        display = self.display
+        top = y + row_start * scale
+        bottom = y + row_end * scale
+        if top < 0:
+            top = 0
+        if bottom > display.height:
+            bottom = display.height
+        band_h = bottom - top
+
+        for run_x, run_len in runs:
+            left = x + run_x * scale
+            width = run_len * scale
+            if clip_x:
+                if left < 0:
+                    width += left
+                    left = 0
+                if left + width > display.width:
+                    width = display.width - left
+                if width <= 0:
+                    continue
+
+            if band_h == 1:
+                display.hline(left, top, width, color)
+            else:
+                display.fill_rect(left, top, width, band_h, color)
+            self.calls += 1
@@ -0,0 +1,78 @@
+# Buzzer playback for the melodies defined in emoji_data
+import badge
+
+from .emoji_data import get_melody, REST
+
+# Longest blocking buzzer call made per tick; keeps the main loop responsive
+MAX_TONE_SLICE = 0.04
+
+
+class SoundManager:
+    def __init__(self, logger):
+        self.logger = logger
+
+        # Scheduler state for the melody currently playing
+        self._notes = None
+        self._index = 0
+        self._freq = REST
+        self._note_end = 0
+
+    def play_emoji_sound(self, emoji_key):
+        """Start the melody that *accurately* matches the emoji's vibe."""
+        self.play(emoji_key)
+
+    def play_notification_sound(self):
+        """Start a gentle notification sound for received emojis"""
+        self.play("notification")
+
+    def play(self, name):
+        """Start a melody by name, preempting anything already playing"""
+        notes = get_melody(name)
+        if notes is None:
+            return
+        self._notes = notes
+        self._index = -2
+        self._freq = REST
+        self._note_end = badge.time.monotonic()
+        self.tick()
+
+    def stop(self):
+        self._notes = None
+        self._freq = REST
+
+    def is_playing(self):
+        return self._notes is not None
+
+    def next_tick_delay(self, idle_delay):
+        """How long the caller may sleep before the next tick is due"""
+        if self._notes is None:
+            return idle_delay
+        if self._freq != REST:
+            # The tone slice itself paces the loop
+            return 0
+        return max(0, min(idle_delay, self._note_end - badge.time.monotonic()))
+
+    def tick(self):
+        """Advance playback; blocks for at most MAX_TONE_SLICE seconds"""
+        if self._notes is None:
+            return
+        try:
+            now = badge.time.monotonic()
+            while now >= self._note_end:
+                self._index += 2
+                if self._index >= len(self._notes):
+                    self.stop()
+                    return
+
+                # Keep notes back to back unless we fell behind (e.g. during a redraw)
+                start = self._note_end
+                if now - start > MAX_TONE_SLICE:
+                    start = now
+                self._freq = self._notes[self._index]
+                self._note_end = start + self._notes[self._index + 1] / 1000
+
+            if self._freq != REST:
+                badge.buzzer.tone(self._freq, min(self._note_end - now, MAX_TONE_SLICE))
+        except Exception as e:
+            self.logger.error("Buzzer error: %s", e)
+            self.stop()
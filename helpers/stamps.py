@@ -0,0 +1,46 @@
+# (mtime, size) stamps that tell whether source files changed without reading them
+import os
+import binascii
+
+STAMP = "<II"  # mtime, size
+NO_STAMP = (0, 0)  # Not recorded yet, e.g. in an asset built off the badge
+
+
+def file_stamp(path):
+    """Return the (mtime, size) of a file, each cut to 32 bits"""
+    st = os.stat(path)
+    return (st[8] & 0xFFFFFFFF, st[6] & 0xFFFFFFFF)
+
+
+def files_crc(paths):
+    """CRC32 over the contents of the files, in order"""
+    crc = 0
+    for path in paths:
+        with open(path, "rb") as f:
+            crc = binascii.crc32(f.read(), crc)
+    return crc & 0xFFFFFFFF
+
+
+def check_stamps(stored, current, source_crc, compute_crc, write_stamps):
+    """Return True if the files behind stored stamps are unchanged
+
+    Cheap check first: unchanged mtime/size means unchanged files. If one
+    moved, compute_crc() decides by content; when it still matches
+    source_crc only the stamps are stale, and write_stamps(current) stores
+    the new ones. Stamps never recorded are filled in without a CRC.
+    """
+    changed = False
+    unrecorded = False
+    for old, new in zip(stored, current):
+        old = tuple(old)
+        if old == tuple(new):
+            continue
+        if old == NO_STAMP:
+            unrecorded = True
+        else:
+            changed = True
+    if changed and compute_crc() != source_crc:
+        return False
+    if changed or unrecorded:
+        write_stamps(current)
+    return True
@@ -0,0 +1,139 @@
+# Text measurement and a cache of rasterized strings for the badge fonts
+try:
+    from collections import OrderedDict
+except ImportError:
+    from ucollections import OrderedDict
+
+try:
+    import framebuf
+except ImportError:
+    framebuf = None
+
+# Byte budget for rasterized strings kept in memory
+DEFAULT_CACHE_BYTES = 12 * 1024
+
+# Average advance per character, used when the display cannot be read back
+ESTIMATED_ADVANCE = {18: 7, 24: 9}
+
+
+class TextLayout:
+    """Measures and draws nice_text strings, reusing rasterized copies
+
+    On first use a string is drawn once into a band at the top of the
+    framebuffer, read back, cropped to its ink and the band is restored.
+    Its real width then drives layout, and later draws are a single blit.
+    """
+
+    def __init__(self, display, renderer, cache_bytes=DEFAULT_CACHE_BYTES):
+        self.display = display
+        self.renderer = renderer
+
+        # (text, font) -> (frame, width, height, size), least recently used first
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self.cache_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        # Saved band and rendered text, reused by every miss; sized for the tallest font seen
+        self._scratch = None
+
+    def measure(self, text, font):
+        """Return (width, height) of the inked part of text, measured or estimated"""
+        entry = self._lookup(text, font)
+        if entry is None:
+            return len(text) * ESTIMATED_ADVANCE.get(font, font * 2 // 5), font
+        return entry[1], entry[2]
+
+    def extent(self, text, font):
+        """Return a (width, height) box text is certain to fit in, for dirty rectangles"""
+        entry = self._lookup(text, font)
+        if entry is None:
+            # Glyphs never exceed 3/4 of the font size in width
+            return len(text) * font * 3 // 4, font + font // 3
+        return entry[1], entry[2]
+
+    def draw(self, text, x, y, font, color=0):
+        """Draw text with its top-left corner at (x, y), like display.nice_text"""
+        entry = self._lookup(text, font) if color == 0 else None
+        if entry is None:
+            self.display.nice_text(text, x, y, font=font, color=color)
+        elif entry[1]:
+            # Key 1 leaves white pixels alone, so only the glyphs are drawn
+            self.display.blit(entry[0], x, y, 1)
+
+    def clear(self):
+        self._cache = OrderedDict()
+        self.cache_used = 0
+
+    def _lookup(self, text, font):
+        key = (text, font)
+        entry = self._cache.pop(key, None)
+        if entry is not None:
+            self._cache[key] = entry
+            self.hits += 1
+            return entry
+
+        self.misses += 1
+        entry = self._rasterize(text, font)
+        if entry is not None and entry[3] <= self.cache_bytes:
+            while self._cache and self.cache_used + entry[3] > self.cache_bytes:
+                oldest = next(iter(self._cache))
+                self.cache_used -= self._cache.pop(oldest)[3]
+                self.evictions += 1
+            self._cache[key] = entry
+            self.cache_used += entry[3]
+        return entry
+
+    def _rasterize(self, text, font):
+        """Render text in a band at the top of the current frame, read it back and restore the band"""
+        renderer = self.renderer
+        if framebuf is None or not renderer.can_blit:
+            return None
+
+        display = self.display
+        width = display.width
+        height = min(display.height, font + font // 2)
+        size = ((width + 7) // 8) * height
+        if self._scratch is None or len(self._scratch[0]) < size:
+            self._scratch = (bytearray(size), bytearray(size))
+        saved = renderer.capture(0, 0, width, height, self._scratch[0])
+        if saved is None:
+            return None
+
+        display.fill_rect(0, 0, width, height, 1)
+        display.nice_text(text, 0, 0, font=font, color=0)
+        captured = renderer.capture(0, 0, width, height, self._scratch[1])
+        display.blit(saved[0], 0, 0)
+        if captured is None:
+            return None
+
+        # Crop to the ink: rightmost and lowest black pixel (a clear bit)
+        buf = captured[1]
+        stride = (width + 7) // 8
+        padding = (1 << (stride * 8 - width)) - 1  # Unused low bits of the last byte in a row
+        ink_width = 0
+        ink_height = 0
+        for row in range(height):
+            start = row * stride
+            for col in range(stride - 1, -1, -1):
+                byte = buf[start + col]
+                if col == stride - 1:
+                    byte |= padding
+                if byte != 0xFF:
+                    right = col * 8 + 8
+                    while byte & 1:
+                        byte >>= 1
+                        right -= 1
+                    if right > ink_width:
+                        ink_width = right
+                    ink_height = row + 1
+                    break
+
+        crop_stride = (ink_width + 7) // 8
+        cropped = bytearray(crop_stride * ink_height)
+        for row in range(ink_height):
+            cropped[row * crop_stride:(row + 1) * crop_stride] = buf[row * stride:row * stride + crop_stride]
+        frame = framebuf.FrameBuffer(cropped, max(1, ink_width), max(1, ink_height), framebuf.MONO_HLSB)
+        return frame, ink_width, ink_height, len(cropped)
@@ -15,105 +15,346 @@ except:
     # Fallback if os module issues
     sys.path.append(f"/apps/{APP_NAME}")
 
-# Import helper modules
+_import_started = badge.time.monotonic()
+
+# Import the helper modules the menu needs; radio and sound are imported on first use
 import apps.emojito.helpers.emoji_data as emoji_data
-import apps.emojito.helpers.radio_handler as radio_handler
 import apps.emojito.helpers.pbm_parser as pbm_parser
 import apps.emojito.helpers.display_manager as display_manager
+import apps.emojito.helpers.atlas as atlas
+import apps.emojito.helpers.inbox as inbox
+import apps.emojito.helpers.input_manager as input_manager
+import apps.emojito.helpers.log as log
+
+IMPORT_TIME = badge.time.monotonic() - _import_started
+
+# Log the contents of the app directories on open (slow: lists / and /apps)
+DEBUG_LIST_FILES = False
+
+# Helper messages below LOG_LEVEL are skipped before formatting. Debug
+# messages (when enabled) are kept in a ring buffer, written out after the
+# first frame and before any error; info and above are written straight away
+LOG_LEVEL = log.INFO
+LOG_RING_SIZE = 32
+
+# Received emoji kept for browsing on the received screen
+INBOX_CAPACITY = 16
+
+# Packets received in the background go to a file on storage until the app
+# is in the foreground again; the alert is one short chirp, at most this often
+RECEIVE_LOG_SIZE = 32
+BACKGROUND_ALERT = (1000, 0.03)  # Hz, seconds
+ALERT_INTERVAL = 5
+
+# UI timing, in seconds
+INPUT_SETTLE = 0.3  # Presses are ignored this long after a screen change
+SOUND_DELAY = 0.1   # Lets the display refresh before a melody starts
+AUTO_CLOSE = 25     # The received screen returns to the menu after this long
 
 
 class App(badge.BaseApp):
     def __init__(self):
         self.current_screen = "menu"  # "menu", "emoji", or "received"
+        self.screen_entered = 0  # When current_screen was last entered
         self.selected_emoji = None
-        self.received_emoji = None  # Store last received emoji data
-        self.last_received_time = 0
+        self.received_emoji = None  # Received emoji data currently on screen
+        
+        # Filled by on_packet, drained and rendered by loop()
+        self.inbox = inbox.Inbox(INBOX_CAPACITY)
+        self.history_pos = 0  # How far back from the newest the received screen is
+        self.input_blocked_until = 0
         
-        # Helper modules will be initialized in on_open()
-        self.radio_handler = None
-        self.sound_manager = None
+        # Pending timed actions: name -> (deadline, callable, args); run by loop()
+        self.timers = {}
+        
+        # Helper modules will be initialized in on_open(); radio, sound and the
+        # background receive log on first use
+        self._helper_logger = None
+        self._radio_handler = None
+        self._sound_manager = None
+        self._receive_log = None
+        self.last_alert = None
         self.pbm_parser = None
         self.display_manager = None
+        self.sprite_atlas = None
         self.button_map = None
+        self.history_buttons = None
+        self.input_manager = None
+        self.screen_buttons = None
+        
+        # (phase, milliseconds) for the last launch, ending with time to first frame
+        self.startup_timings = []
+        self.launches = 0
 
     def on_open(self):
+        started = badge.time.monotonic()
+        phase_started = started
+        timings = []
+        if not self.launches:
+            # Module imports only happen before the first launch
+            timings.append(("import", IMPORT_TIME))
+        
         # Initialize helper modules here where logger is available
         self._initialize_helpers()
+        now = badge.time.monotonic()
+        timings.append(("helpers", now - phase_started))
+        phase_started = now
+        
+        self.timers = {}
+        self.enter_screen("menu")
         
-        self.current_screen = "menu"
-        self.display_manager.debug_list_files()
+        # Another app may have drawn since we last ran, so repaint in full
+        self.display_manager.invalidate()
         self.display_manager.draw_menu()
+        now = badge.time.monotonic()
+        timings.append(("menu", now - phase_started))
+        timings.append(("first frame", now - started))
+        
+        # Contacts may have been edited while another app was open
+        if self._radio_handler:
+            self._radio_handler.invalidate_contacts()
+        
+        # Anything received while closed is shown by the first loop()
+        self.drain_receive_log()
+        
+        if DEBUG_LIST_FILES:
+            self.display_manager.debug_list_files()
+        
+        self.startup_timings = [(phase, int(seconds * 1000)) for phase, seconds in timings]
+        self.helper_logger.info("Startup (ms): %s", self.startup_timings)
+        self.helper_logger.flush()
+        self.launches += 1
+    
+    @property
+    def helper_logger(self):
+        """Level-gated logger shared by the helpers, wrapping the app logger"""
+        if self._helper_logger is None:
+            self._helper_logger = log.Log(self.logger, LOG_LEVEL, log.RingSink(LOG_RING_SIZE),
+                                          write_through=log.INFO)
+        return self._helper_logger
+    
+    @property
+    def radio_handler(self):
+        """Radio handler, created (and its codec imported) on first use"""
+        if self._radio_handler is None:
+            import apps.emojito.helpers.radio_handler as radio_handler
+            self._radio_handler = radio_handler.RadioHandler(self.helper_logger)
+        return self._radio_handler
+    
+    @property
+    def sound_manager(self):
+        """Sound manager, created on first use"""
+        if self._sound_manager is None:
+            import apps.emojito.helpers.sound_manager as sound_manager
+            self._sound_manager = sound_manager.SoundManager(self.helper_logger)
+        return self._sound_manager
+    
+    @property
+    def receive_log(self):
+        """Log of packets received in the background, created on first use"""
+        if self._receive_log is None:
+            import apps.emojito.helpers.receive_log as receive_log
+            self._receive_log = receive_log.ReceiveLog(self.helper_logger, APP_NAME, RECEIVE_LOG_SIZE)
+        return self._receive_log
     
     def on_packet(self, packet, is_foreground):
-        """Handle incoming radio packets with emoji data"""
+        """Decode incoming emoji packets and queue them; loop() renders them
+        
+        In the background only the radio codec is used: the packet is appended
+        to the receive log and a short chirp plays; nothing is drawn until
+        on_open() moves the log into the inbox.
+        """
         try:
-            # Ensure helpers are initialized (for background packet handling)
-            if self.radio_handler is None:
-                self._initialize_helpers()
-            
-            emoji_data = self.radio_handler.handle_packet(packet)
+            received = self.radio_handler.receive(packet)
+            if not received:
+                return
             
-            if emoji_data:
-                self.received_emoji = emoji_data
-                self.last_received_time = badge.time.monotonic()
-                
-                self.logger.info(f"Received emoji '{emoji_data['emoji']}' from {emoji_data['sender']}")
-                
-                # If we're in foreground, show the received emoji immediately
-                if is_foreground:
-                    self.current_screen = "received"
-                    self.display_manager.draw_received_emoji(self.received_emoji)
-                    # Play a notification sound for received emoji
-                    self.sound_manager.play_notification_sound()
-                else:
-                    # If in background, play a subtle notification tone to alert user
-                    badge.buzzer.tone(800, 0.1)  # Short beep
-                    badge.buzzer.tone(1000, 0.1)  # Double beep pattern
+            if is_foreground:
+                self.inbox.push(received[0], received[1], badge.time.monotonic(), received[2])
+            else:
+                self.receive_log.append(received[0], received[1], received[2])
+                self.background_alert()
                     
         except Exception as e:
-            self.logger.error(f"Error in on_packet: {e}")
+            self.helper_logger.error("Error in on_packet: %s", e)
+    
+    def background_alert(self):
+        """One short chirp for a packet received in the background, rate limited
+        
+        badge.buzzer.tone() blocks for the whole tone, so it is kept to 30 ms.
+        """
+        now = badge.time.monotonic()
+        if self.last_alert is not None and now - self.last_alert < ALERT_INTERVAL:
+            return
+        self.last_alert = now
+        try:
+            badge.buzzer.tone(*BACKGROUND_ALERT)
+        except Exception as e:
+            self.helper_logger.error("Buzzer error: %s", e)
+    
+    def drain_receive_log(self):
+        """Move packets logged in the background into the inbox, as pending"""
+        now = badge.time.monotonic()
+        for emoji_key, badge_id, burst in self.receive_log.drain():
+            self.inbox.push(emoji_key, badge_id, now, burst)
+
+    def show_received(self, history_pos):
+        """Show an inbox entry (0 = newest) on the received screen"""
+        record = self.inbox.get(history_pos)
+        if record is None:
+            return
+        
+        emoji_key, badge_id, _, burst = record
+        self.history_pos = history_pos
+        self.received_emoji = {
+            'emoji': emoji_key,
+            'sender': self.radio_handler.resolve_sender(badge_id),
+            'badge_id': badge_id,
+            'burst': burst
+        }
+        self.enter_screen("received")
+        self.display_manager.draw_received_emoji(self.received_emoji, history_pos + 1, len(self.inbox))
+        
+        # Every newly shown entry restarts the auto-close countdown
+        self.start_timer("auto_close", AUTO_CLOSE, self.show_menu)
+    
+    def show_menu(self):
+        self.enter_screen("menu")
+        self.display_manager.draw_menu()
+    
+    def enter_screen(self, screen):
+        """Switch state, cancelling what belonged to the screen being left"""
+        now = badge.time.monotonic()
+        if self.current_screen == "received" and screen != "received":
+            self.cancel_timer("auto_close")
+            if self._radio_handler:
+                self._radio_handler.forget_delivered()
+        
+        self.current_screen = screen
+        self.screen_entered = now
+        
+        # Debounce: presses queued or made right after the change are for the old screen
+        self.input_blocked_until = now + INPUT_SETTLE
+        if self.input_manager:
+            self.input_manager.clear()
+    
+    def start_timer(self, name, delay, action, *args):
+        """Run action(*args) from loop() after delay seconds, replacing a timer of the same name"""
+        self.timers[name] = (badge.time.monotonic() + delay, action, args)
+    
+    def cancel_timer(self, name):
+        self.timers.pop(name, None)
+    
+    def run_timers(self):
+        now = badge.time.monotonic()
+        for name in [name for name, timer in self.timers.items() if now >= timer[0]]:
+            _, action, args = self.timers.pop(name)
+            action(*args)
+    
+    def next_timer_delay(self, idle_delay):
+        """Shorten a sleep so it ends when the earliest timer is due"""
+        if not self.timers:
+            return idle_delay
+        due = min(timer[0] for timer in self.timers.values()) - badge.time.monotonic()
+        return max(0, min(idle_delay, due))
 
     def _initialize_helpers(self):
-        """Initialize helper modules - can be called multiple times safely"""
-        if self.radio_handler is None:
-            self.radio_handler = radio_handler.RadioHandler(self.logger)
-            self.sound_manager = emoji_data.SoundManager(self.logger)
-            self.pbm_parser = pbm_parser.PBMParser(self.logger, APP_NAME)
-            self.display_manager = display_manager.DisplayManager(self.logger, APP_NAME, self.pbm_parser, self.sound_manager)
+        """Initialize what the menu needs - can be called multiple times safely"""
+        if self.display_manager is None:
+            self.pbm_parser = pbm_parser.PBMParser(self.helper_logger, APP_NAME)
+            
+            # Pre-scaled sprites; loaded on first use, rebuilt whenever an asset changes
+            self.sprite_atlas = atlas.SpriteAtlas(self.helper_logger, APP_NAME, self.pbm_parser,
+                                                  badge.display.width, badge.display.height)
+            
+            self.display_manager = display_manager.DisplayManager(self.helper_logger, APP_NAME, self.pbm_parser, self.sprite_atlas)
             self.button_map = emoji_data.get_button_map()
+            
+            # Buttons missing on this hardware revision are skipped
+            history = ((emoji_data.HISTORY_OLDER_BUTTON, 1), (emoji_data.HISTORY_NEWER_BUTTON, -1))
+            names = list(self.button_map) + ["SW5"] + [name for name, _ in history]
+            self.input_manager = input_manager.InputManager(names)
+            self.history_buttons = {name: step for name, step in history if self.input_manager.has_button(name)}
+            
+            # Only the buttons that do something on a screen are scanned there
+            self.screen_buttons = {
+                "menu": tuple(self.button_map),
+                "emoji": ("SW5",) + tuple(self.button_map),
+                "received": ("SW5",) + tuple(self.history_buttons)
+            }
 
     def check_button_presses(self):
-        if self.current_screen == "menu":
-            for button_name, emoji_key in self.button_map.items():
-                button_attr = getattr(badge.input.Buttons, button_name, None)
-                if button_attr and badge.input.get_button(button_attr):
-                    self.selected_emoji = emoji_key
-                    self.current_screen = "emoji"
-                    
-                    # Broadcast the emoji selection to other badges
-                    self.radio_handler.broadcast_emoji(emoji_key)
-                    
-                    self.display_manager.draw_emoji(emoji_key)
-                    # Wait a moment for rendering, then play sound
-                    time.sleep(0.1)
-                    self.sound_manager.play_emoji_sound(emoji_key)
-                    time.sleep(0.3)
-                    return
-                    
-        elif self.current_screen == "emoji" or self.current_screen == "received":
-            if badge.input.get_button(badge.input.Buttons.SW5):
-                self.current_screen = "menu"
-                self.display_manager.draw_menu()
-                time.sleep(0.3)
+        self.input_manager.set_active(self.screen_buttons[self.current_screen])
+        self.input_manager.poll()
+        
+        while True:
+            event = self.input_manager.get_event()
+            if event is None:
+                return
+            kind, button_name, _ = event
+            if kind != input_manager.EVENT_PRESS or badge.time.monotonic() < self.input_blocked_until:
+                continue
+            
+            if self.handle_button(button_name):
                 return
+    
+    def handle_button(self, button_name):
+        """Act on a button press; return True if the screen changed"""
+        if self.current_screen == "menu" or self.current_screen == "emoji":
+            # Picking another emoji straight from the emoji screen lets quick
+            # reactions share one burst packet
+            emoji_key = self.button_map.get(button_name)
+            if emoji_key:
+                self.selected_emoji = emoji_key
+                self.enter_screen("emoji")
+                
+                # Broadcast the emoji selection to other badges
+                self.radio_handler.broadcast_emoji(emoji_key)
+                
+                # Render first; the melody starts once the display has refreshed
+                self.display_manager.draw_emoji(emoji_key)
+                self.start_timer("sound", SOUND_DELAY, self.sound_manager.play_emoji_sound, emoji_key)
+                return True
+        
+        if self.current_screen == "emoji" or self.current_screen == "received":
+            if self.current_screen == "received" and button_name in self.history_buttons:
+                # Browse received history
+                self.show_received(self.history_pos + self.history_buttons[button_name])
+                return True
+            
+            if button_name == "SW5":
+                self.show_menu()
+                return True
+        
+        return False
 
     def loop(self):
-        # Auto-return to menu from received emoji screen after 25 seconds
-        if self.current_screen == "received" and self.received_emoji:
-            if (badge.time.monotonic() - self.last_received_time) > 25:
-                self.current_screen = "menu"
-                self.display_manager.draw_menu()
-                return
+        # Advance any melody that is playing; blocks for at most one short tone slice
+        if self._sound_manager:
+            self._sound_manager.tick()
+        
+        # Send selections batched into a reaction burst once their window closes
+        if self._radio_handler:
+            self._radio_handler.tick()
+        
+        # Delayed sounds and the received screen's auto-close
+        self.run_timers()
+        
+        # Next frame of an animated emoji, if one is due
+        self.display_manager.tick_animation()
+        
+        # Render what arrived since the last tick; a burst becomes one redraw
+        if self.inbox.take_pending():
+            self.show_received(0)
+            # Play a notification sound for received emoji
+            self.start_timer("sound", SOUND_DELAY, self.sound_manager.play_notification_sound)
         
         self.check_button_presses()
-        time.sleep(0.05)
+        
+        # Poll faster while the user is active, wake for the next timer or
+        # animation frame, and sleep less (or not at all) while a melody needs ticking
+        delay = self.next_timer_delay(self.input_manager.next_poll_delay())
+        delay = self.display_manager.next_animation_delay(delay)
+        if self._sound_manager:
+            delay = self._sound_manager.next_tick_delay(delay)
+        time.sleep(delay)
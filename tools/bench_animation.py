@@ -0,0 +1,127 @@
+"""Animated emoji playback benchmark.
+
+Opens each animated emoji's selection screen on a simulated badge with
+partial refresh (animations only play there) and runs App.loop() on a
+virtual clock, as the badge would, until playback stops. For each emoji it
+reports frames per second, display primitive calls per animation frame,
+host CPU time spent in loop() per frame, loop() wakeups in the idle second
+after playback and the size of the animation file. Frames
+are applied both by blitting the changed box ("blit") and, for displays
+without blit, as filled runs ("runs"); "full" is what redrawing the whole
+sprite through the run renderer would cost per frame:
+
+    python tools/bench_animation.py [--seconds 10] [--refresh-ms 0] [--json out.json]
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "sim"))
+
+import appenv  # noqa: E402
+import badge  # noqa: E402  (stub)
+
+appenv.load_app_module()
+
+from apps.emojito.helpers import emoji_data  # noqa: E402
+from apps.emojito.helpers.animation import AnimationPlayer  # noqa: E402
+from apps.emojito.helpers.bitmap import PackedBitmap  # noqa: E402
+from apps.emojito.helpers.renderer import BitmapRenderer  # noqa: E402
+
+
+def play(emoji_key, seconds, refresh_ms, blit):
+    device = badge.Device(refresh_time=refresh_ms / 1000, partial_refresh=True)
+    app = appenv.open_app(device)
+    manager = app.display_manager
+    if not blit:
+        manager.renderer.can_blit = manager.renderer.can_snapshot = False
+
+    app.handle_button(emoji_data.EMOJIS[emoji_key]["button"])
+    player = manager._animation
+    if player is None:
+        return None
+
+    device.display.reset_counts()
+    frames = manager.animation_frames
+    start = device.clock.monotonic()
+    cpu = 0.0
+    while manager._animation is not None and device.clock.monotonic() - start < seconds:
+        started = time.perf_counter()
+        app.loop()
+        cpu += time.perf_counter() - started
+    frames = manager.animation_frames - frames
+    elapsed = device.clock.monotonic() - start
+
+    idle_start = device.clock.monotonic()
+    idle_loops = 0
+    while device.clock.monotonic() - idle_start < 1:
+        app.loop()
+        idle_loops += 1
+
+    return {
+        "frames": frames,
+        "fps": frames / elapsed,
+        "primitives_per_frame": sum(device.display.counts.values()) / frames if frames else None,
+        "cpu_us_per_frame": cpu / frames * 1e6 if frames else None,
+        "idle_loops_per_sec": idle_loops,
+        "player": player,
+    }
+
+
+def full_redraw_primitives(player):
+    """Primitive calls to redraw every frame in full with the run renderer"""
+    device = badge.Device().activate()
+    renderer = BitmapRenderer(device.display)
+    animation = player.animation
+    player.reset()
+    total = 0
+    for _ in range(animation.frame_count):
+        player.advance()
+        renderer.reset_calls()
+        device.display.fill_rect(0, 0, animation.width, animation.height, 1)
+        renderer.draw(PackedBitmap(animation.width, animation.height, player.frame), 0, 0, value=0)
+        total += renderer.calls + 1
+    return total / animation.frame_count
+
+
+def main():
+    args = sys.argv[1:]
+    options = {"--seconds": "10", "--refresh-ms": "0", "--json": None}
+    for name in list(options):
+        if name in args:
+            options[name] = args[args.index(name) + 1]
+    seconds = float(options["--seconds"])
+    refresh_ms = float(options["--refresh-ms"])
+
+    results = {}
+    for emoji_key in emoji_data.EMOJI_ORDER:
+        blit = play(emoji_key, seconds, refresh_ms, True)
+        if blit is None:
+            continue
+        runs = play(emoji_key, seconds, refresh_ms, False)
+        animation = blit.pop("player").animation
+        runs.pop("player")
+        results[emoji_key] = {
+            "file_bytes": os.path.getsize(os.path.join(appenv.ROOT, emoji_data.EMOJIS[emoji_key]["anim_file"])),
+            "blit": blit,
+            "runs": runs,
+            "full_redraw_primitives": full_redraw_primitives(AnimationPlayer(animation)),
+        }
+
+    print(f"{'emoji':10s} {'bytes':>6} {'fps':>6} {'prims blit':>10} {'prims runs':>10} {'prims full':>10} "
+          f"{'us/frame':>9} {'idle loops/s':>12}")
+    for key, r in results.items():
+        print(f"{key:10s} {r['file_bytes']:6d} {r['blit']['fps']:6.1f} {r['blit']['primitives_per_frame']:10.1f} "
+              f"{r['runs']['primitives_per_frame']:10.1f} {r['full_redraw_primitives']:10.1f} "
+              f"{r['blit']['cpu_us_per_frame']:9.0f} {r['blit']['idle_loops_per_sec']:12d}")
+
+    if options["--json"]:
+        with open(options["--json"], "w") as f:
+            json.dump({"seconds": seconds, "refresh_ms": refresh_ms, "emoji": results},
+                      f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
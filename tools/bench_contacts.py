@@ -0,0 +1,74 @@
+"""Contact handle cache benchmark.
+
+Replays sender lookups from a busy venue (a few dozen badges, some much
+chattier than others) against a stub contact store whose lookups sleep to
+mimic storage access, with and without RadioHandler's handle cache:
+
+    python tools/bench_contacts.py [lookups] [lookup_ms]
+"""
+import os
+import random
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "sim"))
+sys.path.insert(0, ROOT)
+
+import badge  # noqa: E402  (stub)
+from helpers.log import Log  # noqa: E402
+from helpers.radio_handler import RadioHandler  # noqa: E402
+
+BADGES = 40
+
+
+class Contact:
+    def __init__(self, handle):
+        self.handle = handle
+
+
+class SlowContacts:
+    """Contact store where every lookup costs lookup_ms of 'storage' time"""
+
+    def __init__(self, lookup_ms):
+        self.delay = lookup_ms / 1000
+        self.lookups = 0
+
+    def get_contact_by_badge_id(self, badge_id):
+        self.lookups += 1
+        time.sleep(self.delay)
+        return Contact(f"attendee{badge_id}") if badge_id % 5 else None
+
+    def my_contact(self):
+        self.lookups += 1
+        time.sleep(self.delay)
+        return Contact("me")
+
+
+def run(handler, senders):
+    start = time.perf_counter()
+    for badge_id in senders:
+        handler.resolve_sender(badge_id)
+    return time.perf_counter() - start
+
+
+def main():
+    lookups = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    lookup_ms = float(sys.argv[2]) if len(sys.argv) > 2 else 2.0
+
+    # Zipf-like traffic: low badge ids send far more often
+    rng = random.Random(1)
+    weights = [1 / (rank + 1) for rank in range(BADGES)]
+    senders = rng.choices(range(0x100, 0x100 + BADGES), weights, k=lookups)
+
+    for label, cache_size in (("uncached", 0), ("cached", 64)):
+        badge.contacts = SlowContacts(lookup_ms)
+        handler = RadioHandler(Log(badge.Logger()), handle_cache_size=cache_size)
+        elapsed = run(handler, senders)
+        print(f"{label:9s} {elapsed / lookups * 1e6:9.1f} us/lookup  "
+              f"store lookups {badge.contacts.lookups:5d}  "
+              f"hit rate {handler.handle_hit_rate():.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Logging overhead per packet and per render.
+
+Compares three configurations of the helpers' logger on the simulated badge:
+
+  write-all  every message formatted and written out (the old behaviour)
+  ring       every message formatted, kept in memory by the ring sink
+  gated      the app default: debug skipped unformatted, info written out
+
+    python tools/bench_logging.py [iterations]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "sim"))
+sys.path.insert(0, ROOT)
+
+import badge  # noqa: E402  (stub)
+from helpers import emoji_data, log, packet_codec  # noqa: E402
+from helpers.pbm_parser import PBMParser  # noqa: E402
+from helpers.radio_handler import RadioHandler  # noqa: E402
+
+
+REPEAT = 5
+
+
+class StreamLogger:
+    """Badge-style logger that writes every line, like the firmware console"""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def _write(self, level, msg):
+        self.stream.write(f"[{level}] {msg}\n")
+
+    def debug(self, msg):
+        self._write("debug", msg)
+
+    def info(self, msg):
+        self._write("info", msg)
+
+    def warning(self, msg):
+        self._write("warning", msg)
+
+    def error(self, msg):
+        self._write("error", msg)
+
+
+def configurations(stream):
+    return [
+        ("write-all", log.Log(StreamLogger(stream), log.DEBUG)),
+        ("ring", log.Log(StreamLogger(stream), log.DEBUG, log.RingSink(32))),
+        ("gated", log.Log(StreamLogger(stream), log.INFO, log.RingSink(32), write_through=log.INFO)),
+    ]
+
+
+def per_packet(logger, iterations):
+    """One broadcast plus one received packet (a third of them invalid)"""
+    badge.Device().activate()
+    handler = RadioHandler(logger)
+    keys = emoji_data.EMOJI_ORDER
+    packets = []
+    for i in range(iterations):
+        data = packet_codec.encode_emoji(keys[i % len(keys)], seq=i & 0xFF)
+        packets.append(badge.Packet(2000 + i, data if i % 3 else b"\x00junk"))
+
+    start = time.perf_counter()
+    for i, packet in enumerate(packets):
+        badge.time.advance(2.0)  # Past the burst window, so every broadcast is sent
+        handler.broadcast_emoji(keys[i % len(keys)])
+        handler.receive(packet)
+    return (time.perf_counter() - start) / iterations
+
+
+def per_render(logger, iterations):
+    """One uncached PBM load, as done when a sprite is missing from the atlas"""
+    parser = PBMParser(logger, "emojito", cache_bytes=0)
+    parser.base_dir = ROOT
+    files = [emoji_data.EMOJIS[key]["pbm_file"] for key in emoji_data.EMOJI_ORDER]
+
+    start = time.perf_counter()
+    for i in range(iterations):
+        parser.parse_pbm_file(files[i % len(files)])
+    return (time.perf_counter() - start) / iterations
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    with open(os.devnull, "w") as stream:
+        results = []
+        for name, logger in configurations(stream):
+            # Best of several runs, to keep scheduler noise out of small differences
+            packet = min(per_packet(logger, iterations) for _ in range(REPEAT))
+            render = min(per_render(logger, iterations // 5) for _ in range(REPEAT))
+            results.append((name, packet, render))
+
+    baseline_packet, baseline_render = results[0][1], results[0][2]
+    print(f"{'config':10s} {'us/packet':>10s} {'us/render':>10s}")
+    for name, packet, render in results:
+        print(f"{name:10s} {packet * 1e6:10.2f} {render * 1e6:10.2f}"
+              f"   ({(baseline_packet - packet) * 1e6:+.2f} / {(baseline_render - render) * 1e6:+.2f} us saved)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""PBM parse throughput benchmark.
+
+Runs on plain CPython against the stub badge module in tools/sim:
+
+    python tools/bench_parse.py [iterations]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "sim"))
+sys.path.insert(0, ROOT)
+
+import badge  # noqa: E402  (stub)
+from helpers import emoji_data  # noqa: E402
+from helpers.log import Log  # noqa: E402
+from helpers.pbm_parser import PBMParser  # noqa: E402
+
+
+def bench(parser, files, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        for filename in files:
+            width, height, bitmap = parser.parse_pbm_file(filename)
+            if bitmap is None:
+                raise SystemExit(f"failed to parse {filename}")
+    return time.perf_counter() - start
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    files = [emoji_data.EMOJIS[key]["pbm_file"] for key in emoji_data.EMOJI_ORDER] + ["logo.pbm"]
+    total_bytes = sum(os.path.getsize(os.path.join(ROOT, f)) for f in files)
+
+    # Cold: cache disabled, every call reads and decodes the file
+    cold = PBMParser(Log(badge.Logger()), "emojito", cache_bytes=0)
+    cold.base_dir = ROOT
+    cold_time = bench(cold, files, iterations)
+
+    # Warm: every call after the first is a cache hit
+    warm = PBMParser(Log(badge.Logger()), "emojito")
+    warm.base_dir = ROOT
+    warm_time = bench(warm, files, iterations)
+
+    loads = iterations * len(files)
+    print(f"files: {len(files)}, iterations: {iterations}")
+    print(f"cold parse:   {cold_time / loads * 1e6:8.1f} us/file  "
+          f"{total_bytes * iterations / cold_time / 1e6:6.2f} MB/s")
+    print(f"cached parse: {warm_time / loads * 1e6:8.1f} us/file  "
+          f"hit rate {warm.cache_hits / loads:.1%}")
+
+
+if __name__ == "__main__":
+    main()
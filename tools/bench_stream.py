@@ -0,0 +1,157 @@
+"""Streamed P4 drawing check and benchmark.
+
+Writes full-screen P4 images whose header has a # comment and tab and
+space separators (no newlines between fields), then draws each with
+DisplayManager.draw_pbm_streamed() on the simulated badge. Every row the
+stream yields must equal the same row from parse_pbm_file(), and the
+screen must match drawing the parsed bitmap. Exits non-zero on a mismatch.
+
+For both paths it reports the best time and the peak Python memory of one
+draw, with files opened unbuffered as on MicroPython. The stream itself
+holds one row and its read buffer ("buffers"); the rest of its peak is
+the current row's runs, which grow with how busy a row is ("noise" is the
+worst case, "rings" is closer to artwork):
+
+    python tools/bench_stream.py [--repeat 20] [--seed 1]
+"""
+import builtins
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "sim"))
+
+import appenv  # noqa: E402
+import badge  # noqa: E402  (stub)
+
+appenv.load_app_module()
+
+FILENAME = "assets/bench_stream.pbm"
+READ_BUFFER = 32  # PBMRowStream's default buffer_size
+
+_open = builtins.open
+
+
+def _unbuffered_open(path, mode="r", *args, **kwargs):
+    # CPython puts an 8 KB buffer behind every binary file; MicroPython does not
+    if "b" in mode and not args and "buffering" not in kwargs:
+        kwargs["buffering"] = 0
+    return _open(path, mode, *args, **kwargs)
+
+
+def noise(width, height, seed):
+    rng = random.Random(seed)
+    return lambda x, y: rng.getrandbits(1)
+
+
+def rings(width, height, seed):
+    cx, cy = width // 2, height // 2
+    return lambda x, y: ((x - cx) ** 2 + (y - cy) ** 2) // 300 % 2
+
+
+def write_image(path, width, height, pixel):
+    """Write a P4 file with pixel(x, y) -> 1 for black; returns its size"""
+    stride = (width + 7) // 8
+    raster = bytearray(stride * height)
+    for y in range(height):
+        for x in range(width):
+            if pixel(x, y):
+                raster[y * stride + (x >> 3)] |= 0x80 >> (x & 7)
+    header = b"P4\t# full-screen stream check\n%d \t%d\t" % (width, height)
+    with open(path, "wb") as f:
+        f.write(header + raster)
+    return len(header) + len(raster)
+
+
+def measured(fn, repeat):
+    """Best time of repeat calls, and the peak memory Python allocated during one
+
+    The screen is cleared before each call, outside the measurement.
+    """
+    best = None
+    for _ in range(repeat):
+        badge.display.fill(1)
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    badge.display.fill(1)
+    builtins.open = _unbuffered_open
+    try:
+        tracemalloc.start()
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    finally:
+        builtins.open = _open
+    return best, peak
+
+
+def check(app, name, pixel, repeat):
+    """Draw one image both ways; return (report line, problems)"""
+    display = badge.display
+    manager = app.display_manager
+    parser = app.pbm_parser
+    size = write_image(os.path.join(parser.base_dir, FILENAME), display.width, display.height, pixel)
+    parser.clear_cache()
+
+    problems = []
+    width, height, bitmap = parser.parse_pbm_file(FILENAME)
+    with parser.open_pbm_stream(FILENAME) as stream:
+        if (stream.width, stream.height) != (width, height):
+            problems.append(f"{name}: stream header {stream.width}x{stream.height}, parsed {width}x{height}")
+        else:
+            for y, row in enumerate(stream.rows()):
+                if bytes(row) != bytes(bitmap.row(y)):
+                    problems.append(f"{name}: row {y} differs")
+                    break
+
+    def streamed():
+        manager.draw_pbm_streamed(FILENAME)
+
+    def parsed():
+        parser.clear_cache()
+        manager.renderer.draw(parser.parse_pbm_file(FILENAME)[2], 0, 0)
+
+    display.fill(1)
+    parsed()
+    expected = bytes(display.buf)
+    display.fill(1)
+    streamed()
+    if bytes(display.buf) != expected:
+        problems.append(f"{name}: streamed screen differs from the parsed bitmap")
+
+    stream_time, stream_peak = measured(streamed, repeat)
+    parse_time, parse_peak = measured(parsed, repeat)
+    line = (f"{name:6s} {size:6d} {stream_time * 1000:9.2f} {stream_peak:12d} "
+            f"{(width + 7) // 8 + READ_BUFFER:8d} {parse_time * 1000:9.2f} {parse_peak:12d}")
+    return line, problems
+
+
+def main():
+    args = sys.argv[1:]
+    repeat = int(args[args.index("--repeat") + 1]) if "--repeat" in args else 20
+    seed = int(args[args.index("--seed") + 1]) if "--seed" in args else 1
+
+    device = badge.Device()
+    app = appenv.open_app(device)
+    width, height = device.display.width, device.display.height
+
+    print(f"{width}x{height} P4")
+    print(f"{'image':6s} {'bytes':>6} {'stream ms':>9} {'stream peak':>12} {'buffers':>8} "
+          f"{'parse ms':>9} {'parse peak':>12}")
+    problems = []
+    for name, pattern in (("noise", noise), ("rings", rings)):
+        line, found = check(app, name, pattern(width, height, seed), repeat)
+        print(line)
+        problems += found
+    print(f"check: {'; '.join(problems) if problems else 'ok'}")
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
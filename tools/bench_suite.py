@@ -0,0 +1,300 @@
+"""Benchmark suite for CI: parse, render, codec, receive flood and UI loop, written as JSON.
+
+Runs on plain CPython against the simulated badge in tools/sim. Times are
+host CPU times, so compare runs from the same machine; primitive counts,
+virtual-clock latencies and the flood's filter counters are deterministic
+and comparable anywhere.
+
+    python tools/bench_suite.py [--output results.json] [--quick]
+"""
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "sim"))
+sys.path.insert(0, os.path.join(ROOT, "tools"))
+
+import appenv  # noqa: E402
+import badge  # noqa: E402  (stub)
+import ui_latency  # noqa: E402
+
+appenv.load_app_module()
+from apps.emojito.helpers import emoji_data, packet_codec  # noqa: E402
+from apps.emojito.helpers.atlas import SpriteAtlas  # noqa: E402
+from apps.emojito.helpers.display_manager import DisplayManager  # noqa: E402
+from apps.emojito.helpers.log import Log  # noqa: E402
+from apps.emojito.helpers.pbm_parser import PBMParser  # noqa: E402
+from apps.emojito.helpers.radio_handler import RadioHandler  # noqa: E402
+
+SCHEMA_VERSION = 1
+
+
+def _timed(fn, repeat):
+    """Best-of-repeat seconds for one call of fn"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def _parser(cache_bytes=None):
+    if cache_bytes is None:
+        parser = PBMParser(Log(badge.Logger()), "emojito")
+    else:
+        parser = PBMParser(Log(badge.Logger()), "emojito", cache_bytes=cache_bytes)
+    parser.base_dir = appenv.app_dir()
+    return parser
+
+
+def bench_parse(repeat):
+    files = [emoji_data.EMOJIS[key]["pbm_file"] for key in emoji_data.EMOJI_ORDER] + ["logo.pbm"]
+    cold = _parser(cache_bytes=0)
+    warm = _parser()
+    for filename in files:
+        warm.parse_pbm_file(filename)
+
+    per_file = {}
+    for filename in files:
+        per_file[filename] = {
+            "cold_us": _timed(lambda: cold.parse_pbm_file(filename), repeat) * 1e6,
+            "cached_us": _timed(lambda: warm.parse_pbm_file(filename), repeat) * 1e6,
+            "bytes": os.path.getsize(os.path.join(ROOT, filename)),
+        }
+
+    # Emoji bitmaps read from the asset bundle instead of their PBM files
+    bundled = {}
+    for emoji_key in emoji_data.EMOJI_ORDER:
+        bundled[emoji_key] = _timed(lambda: cold.parse_emoji(emoji_key), repeat) * 1e6
+    return {
+        "files": per_file,
+        "cold_us_mean": sum(f["cold_us"] for f in per_file.values()) / len(per_file),
+        "cached_us_mean": sum(f["cached_us"] for f in per_file.values()) / len(per_file),
+        "bundle_us": bundled,
+        "bundle_us_mean": sum(bundled.values()) / len(bundled),
+        "bundle_mapped": cold.open_bundle().stable_views if cold.open_bundle() else None,
+    }
+
+
+def _render_frames(manager):
+    """A screen sequence as (name, callable presenting that frame)
+
+    Each frame is drawn on top of the previous one, as on the badge, so later
+    frames exercise the partial redraw and the cached menu.
+    """
+    keys = emoji_data.EMOJI_ORDER
+    received = {'emoji': keys[0], 'sender': 'bench', 'badge_id': 1, 'burst': None}
+    burst = dict(received, burst=tuple((key, i + 1) for i, key in enumerate(keys[:5])))
+    return [
+        ("menu", manager.draw_menu),
+        ("emoji", lambda: manager.draw_emoji(keys[0])),
+        ("emoji_switch", lambda: manager.draw_emoji(keys[1])),
+        ("menu_cached", manager.draw_menu),
+        ("received", lambda: manager.draw_received_emoji(received, 1, 3)),
+        ("received_next", lambda: manager.draw_received_emoji(dict(received, emoji=keys[2]), 2, 3)),
+        ("burst", lambda: manager.draw_received_emoji(burst, 1, 1)),
+    ]
+
+
+def bench_render(repeat, atlas_dir):
+    results = {}
+    for config, use_atlas, partial in (("atlas", True, False), ("atlas_partial", True, True),
+                                       ("no_atlas", False, False)):
+        device = badge.Device(partial_refresh=partial).activate()
+        parser = _parser()
+        atlas = None
+        config_result = {}
+        if use_atlas:
+            atlas = SpriteAtlas(Log(badge.Logger()), "emojito", parser, device.display.width, device.display.height)
+            atlas.path = os.path.join(atlas_dir, "atlas.bin")
+            start = time.perf_counter()
+            atlas.load()
+            config_result["atlas_load_ms"] = (time.perf_counter() - start) * 1000
+
+        # Replay the whole sequence with a fresh manager each run; keep the best time per frame
+        frames = {}
+        for run in range(repeat):
+            manager = DisplayManager(Log(badge.Logger()), "emojito", parser, atlas)
+            for name, draw in _render_frames(manager):
+                device.display.reset_counts()
+                start = time.perf_counter()
+                draw()
+                elapsed = (time.perf_counter() - start) * 1000
+                if run == 0:
+                    counts = device.display.counts
+                    frames[name] = {
+                        "primitives": sum(counts.values()),
+                        "counts": {k: v for k, v in counts.items() if v},
+                        "image_primitives": manager.last_frame_primitives,
+                        "dirty_rects": len(manager.last_dirty_rects),
+                        "ms": elapsed,
+                    }
+                else:
+                    frames[name]["ms"] = min(frames[name]["ms"], elapsed)
+
+        # Once more on the last manager, with text layouts already rasterized
+        for name, draw in _render_frames(manager):
+            device.display.reset_counts()
+            draw()
+            frames[name]["warm_primitives"] = sum(device.display.counts.values())
+        config_result["text_cache"] = {"hits": manager.text.hits, "misses": manager.text.misses,
+                                       "bytes": manager.text.cache_used}
+        config_result["frames"] = frames
+        results[config] = config_result
+    return results
+
+
+def bench_codec(count):
+    keys = emoji_data.EMOJI_ORDER
+    packets = [packet_codec.encode_emoji(keys[i % len(keys)], seq=i & 0xFF) for i in range(count)]
+
+    start = time.perf_counter()
+    for i in range(count):
+        packet_codec.encode_emoji(keys[i % len(keys)], seq=i & 0xFF)
+    encode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for data in packets:
+        packet_codec.decode(data)
+    decode = time.perf_counter() - start
+
+    legacy = [packet_codec.encode_legacy(keys[i % len(keys)], "bench") for i in range(count)]
+    start = time.perf_counter()
+    for data in legacy:
+        packet_codec.decode(data)
+    decode_legacy = time.perf_counter() - start
+
+    # Full receive path; senders rotate so most packets are admitted
+    device = badge.Device().activate()
+    handler = RadioHandler(Log(badge.Logger()))
+    incoming = [badge.Packet(1000 + i % 64, data) for i, data in enumerate(packets)]
+    start = time.perf_counter()
+    for packet in incoming:
+        device.clock.advance(0.05)
+        handler.receive(packet)
+    receive = time.perf_counter() - start
+
+    return {
+        "packets": count,
+        "encode_per_s": count / encode,
+        "decode_per_s": count / decode,
+        "decode_legacy_per_s": count / decode_legacy,
+        "receive_per_s": count / receive,
+        "receive_stats": dict(handler.stats),
+    }
+
+
+def bench_flood():
+    """Five seconds of hostile traffic through the receive filter, with its counters
+
+    - badge 0x0A floods: the same emoji with a new sequence number every
+      25 ms, and the mesh repeats every packet
+    - badge 0x0B behaves: two emoji 2.5 s apart, each repeated by the mesh
+    - badge 0x0C is an old badge: its JSON packet sent every 100 ms,
+      switching emoji every second
+    """
+    keys = emoji_data.EMOJI_ORDER
+    traffic = []  # (time, source badge, data)
+    for i in range(200):
+        data = packet_codec.encode_emoji(keys[0], seq=i & 0xFF)
+        traffic += [(i * 0.025, 0x0A, data), (i * 0.025 + 0.005, 0x0A, data)]
+    for i in range(2):
+        data = packet_codec.encode_emoji(keys[1 + i], seq=i)
+        traffic += [(i * 2.5 + 0.01, 0x0B, data), (i * 2.5 + 0.3, 0x0B, data)]
+    for i in range(50):
+        data = packet_codec.encode_legacy(keys[3 + (i // 10) % 2], "old badge")
+        traffic.append((i * 0.1 + 0.002, 0x0C, data))
+    traffic.sort(key=lambda item: item[0])
+
+    device = badge.Device().activate()
+    handler = RadioHandler(Log(badge.Logger()))
+    host = 0.0
+    for at, source, data in traffic:
+        device.clock.advance(at - device.clock.now)
+        packet = badge.Packet(source, data)
+        start = time.perf_counter()
+        handler.receive(packet)
+        host += time.perf_counter() - start
+
+    stats = handler.stats
+    return {
+        "packets": len(traffic),
+        "seconds": traffic[-1][0],
+        "receive_us": host / len(traffic) * 1e6,
+        "stats": {name: stats[name] for name in
+                  ("received", "delivered", "invalid", "duplicates", "rate_limited", "coalesced")},
+    }
+
+
+def bench_loop():
+    start = time.perf_counter()
+    results, worst_loop = ui_latency.run(ui_latency.parse_timeline(ui_latency.DEFAULT_TIMELINE))
+    host = time.perf_counter() - start
+    answered = [latency for _, _, latency in results if latency is not None]
+    return {
+        "inputs": len(results),
+        "answered": len(answered),
+        "worst_response_ms": max(answered) * 1000 if answered else None,
+        "mean_response_ms": sum(answered) / len(answered) * 1000 if answered else None,
+        "longest_loop_ms": worst_loop * 1000,
+        "host_seconds": host,
+    }
+
+
+def main():
+    args = sys.argv[1:]
+    output = None
+    if "--output" in args:
+        i = args.index("--output")
+        output = args[i + 1]
+        del args[i:i + 2]
+    quick = "--quick" in args
+    repeat = 3 if quick else 20
+
+    atlas_dir = tempfile.mkdtemp(prefix="emojito-bench-")
+    try:
+        report = {
+            "schema": SCHEMA_VERSION,
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "benchmarks": {
+                "parse": bench_parse(repeat),
+                "render": bench_render(repeat, atlas_dir),
+                "codec": bench_codec(500 if quick else 5000),
+                "flood": bench_flood(),
+                "loop": bench_loop(),
+            },
+        }
+    finally:
+        shutil.rmtree(atlas_dir, ignore_errors=True)
+
+    text = json.dumps(report, indent=2, sort_keys=True)
+    if output:
+        with open(output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    benchmarks = report["benchmarks"]
+    summary = [
+        f"parse: cold {benchmarks['parse']['cold_us_mean']:.0f} us, cached {benchmarks['parse']['cached_us_mean']:.1f} us, "
+        f"bundle {benchmarks['parse']['bundle_us_mean']:.1f} us",
+        f"render (atlas): emoji {benchmarks['render']['atlas']['frames']['emoji']['primitives']} primitives (warm {benchmarks['render']['atlas']['frames']['emoji']['warm_primitives']})",
+        f"codec: decode {benchmarks['codec']['decode_per_s']:.0f}/s, receive {benchmarks['codec']['receive_per_s']:.0f}/s",
+        "flood: {received} received, {delivered} delivered, {duplicates} duplicate, "
+        "{rate_limited} rate limited, {coalesced} coalesced".format(**benchmarks['flood']['stats']),
+        f"loop: worst response {benchmarks['loop']['worst_response_ms']:.1f} ms",
+    ]
+    print("\n".join(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
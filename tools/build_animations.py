@@ -0,0 +1,94 @@
+"""Build the animated emoji files from the static PBM sprites.
+
+Emoji with an "anim_file" in helpers/emoji_data.py get a short looping
+animation generated from their PBM: sparkles (small stars blink in turn
+around the sprite), a bounce (the sprite rises and falls a few pixels) or a
+shake (it slides left and right). Frame 0 is always the untouched sprite.
+Files are written to the "anim_file" path, in the format of
+helpers/animation.py:
+
+    python tools/build_animations.py [--frame-ms 90]
+"""
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "sim"))
+sys.path.insert(0, ROOT)
+
+import badge  # noqa: E402  (stub)
+from helpers import emoji_data  # noqa: E402
+from helpers.animation import Animation, encode_animation  # noqa: E402
+from helpers.bitmap import PackedBitmap  # noqa: E402
+from helpers.log import Log  # noqa: E402
+from helpers.pbm_parser import PBMParser  # noqa: E402
+
+# Per frame: (dx, dy) offset of the sprite and the sparkles shown
+EFFECTS = {
+    "sparkle": [((0, 0), ()), ((0, 0), (0,)), ((0, 0), (0, 1)), ((0, 0), (1, 2)),
+                ((0, 0), (2, 3)), ((0, 0), (3,))],
+    "bounce": [((0, dy), ()) for dy in (0, -2, -4, -5, -4, -2)],
+    "shake": [((dx, 0), ()) for dx in (0, 2, 3, 0, -2, -3)],
+}
+EMOJI_EFFECTS = {"heart": "bounce", "laugh": "shake"}
+
+# Sparkle centres, as offsets from the sprite's corners
+SPARKLES = ((5, 5), (-6, 8), (-5, -6), (8, -5))
+SPARKLE_ARM = 3
+
+
+def render_frame(bitmap, offset, sparkles):
+    """bitmap moved by offset with sparkles drawn on, packed in display polarity (bit set = white)"""
+    dx, dy = offset
+    frame = PackedBitmap(bitmap.width, bitmap.height)
+    for y in range(bitmap.height):
+        source_y = y - dy
+        if not 0 <= source_y < bitmap.height:
+            continue
+        for run_x, run_len in bitmap.runs(source_y):
+            for x in range(max(0, run_x + dx), min(bitmap.width, run_x + run_len + dx)):
+                frame.set_pixel(x, y, 1)
+
+    for index in sparkles:
+        cx, cy = SPARKLES[index]
+        cx %= bitmap.width
+        cy %= bitmap.height
+        for d in range(-SPARKLE_ARM, SPARKLE_ARM + 1):
+            frame.set_pixel(cx + d, cy, 1)
+            frame.set_pixel(cx, cy + d, 1)
+    return bytes(b ^ 0xFF for b in frame.data)
+
+
+def build(emoji_key, parser, frame_ms):
+    item = emoji_data.EMOJIS[emoji_key]
+    width, height, bitmap = parser.parse_pbm_file(item["pbm_file"])
+    if bitmap is None:
+        raise SystemExit(f"cannot load {item['pbm_file']}")
+
+    effect = EFFECTS[EMOJI_EFFECTS.get(emoji_key, "sparkle")]
+    frames = [render_frame(bitmap, offset, sparkles) for offset, sparkles in effect]
+    data = encode_animation(frames, width, height, [frame_ms] * len(frames))
+    Animation(data)  # Fails loudly if the file would not load on the badge
+
+    path = os.path.join(ROOT, item["anim_file"])
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    return path, len(data), len(frames[0]) * len(frames)
+
+
+def main():
+    args = sys.argv[1:]
+    frame_ms = int(args[args.index("--frame-ms") + 1]) if "--frame-ms" in args else 90
+
+    parser = PBMParser(Log(badge.Logger()), "emojito")
+    parser.base_dir = ROOT
+    for emoji_key in emoji_data.EMOJI_ORDER:
+        if "anim_file" not in emoji_data.EMOJIS[emoji_key]:
+            continue
+        path, size, raw = build(emoji_key, parser, frame_ms)
+        print(f"{os.path.relpath(path, ROOT):28s} {size:6d} bytes ({raw} as raw frames)")
+
+
+if __name__ == "__main__":
+    main()
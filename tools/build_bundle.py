@@ -0,0 +1,58 @@
+"""Pack every emoji bitmap into the single asset bundle the app reads.
+
+Decodes each emoji's PBM file and writes their packed rows, behind a fixed
+header, a blank (mtime, size) stamp per PBM that the badge fills in on
+first open, and a key -> (offset, width, height) index, to the bundle path
+in helpers/bundle.py. Run it again after changing any assets/*.pbm: until
+then the app sees that the PBMs no longer match the bundle and reads them
+instead, and the sprite atlas rebuilds itself from whichever it uses:
+
+    python tools/build_bundle.py
+"""
+import binascii
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(ROOT, "tools", "sim"))
+sys.path.insert(0, ROOT)
+
+import badge  # noqa: E402  (stub)
+from helpers import emoji_data  # noqa: E402
+from helpers.bundle import AssetBundle, BUNDLE_FILE, pack_bundle  # noqa: E402
+from helpers.log import Log  # noqa: E402
+from helpers.pbm_parser import PBMParser  # noqa: E402
+
+
+def main():
+    parser = PBMParser(Log(badge.Logger()), "emojito", cache_bytes=0)
+    parser.base_dir = ROOT
+    parser.bundle_file = None
+
+    images = []
+    crc = 0
+    for emoji_key in emoji_data.EMOJI_ORDER:
+        pbm_file = emoji_data.EMOJIS[emoji_key]["pbm_file"]
+        with open(os.path.join(ROOT, pbm_file), "rb") as f:
+            # Same CRC the sprite atlas computes over the PBM files
+            crc = binascii.crc32(f.read(), crc)
+        width, height, bitmap = parser.parse_pbm_file(pbm_file)
+        if bitmap is None:
+            raise SystemExit(f"cannot load {pbm_file}")
+        images.append((emoji_key, width, height, bytes(bitmap.data[:bitmap.nbytes])))
+
+    path = os.path.join(ROOT, BUNDLE_FILE)
+    with open(path, "wb") as f:
+        f.write(pack_bundle(images, crc & 0xFFFFFFFF))
+
+    # Read every entry back the way the badge will
+    bundle = AssetBundle(path)
+    for emoji_key, width, height, data in images:
+        if bundle.read(emoji_key) is None or bytes(bundle.read(emoji_key)[2]) != data:
+            raise SystemExit(f"bundle entry {emoji_key} does not read back")
+    bundle.close()
+    print(f"{BUNDLE_FILE}: {len(images)} emoji, {os.path.getsize(path)} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""Multi-badge radio mesh simulator.
+
+Runs N copies of the app, each on its own simulated badge, as a discrete-event
+simulation over one shared broadcast channel. Users press emoji buttons at
+random; packets occupy the channel for their airtime, overlapping
+transmissions collide (pure ALOHA, no carrier sense), and each surviving copy
+may still be lost independently. Survivors are handed to App.on_packet when
+their transmission ends.
+
+For each badge count it reports delivery ratio, transmit-to-display latency,
+host CPU time per badge and channel airtime use:
+
+    python tools/mesh_sim.py [--badges 2,5,10,20] [--duration 30] [--rate 0.05]
+                             [--loss 0.02] [--seed 1] [--json out.json]
+
+rate is how often each simulated user sets out to send an emoji, per second;
+the "sent" column shows how many of those selections actually happened.
+"""
+import heapq
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "sim"))
+
+import appenv  # noqa: E402
+import badge  # noqa: E402  (stub)
+
+# 802.15.4-style PHY: 250 kbit/s, plus preamble/PHY header and MAC framing
+BITRATE = 250000
+FRAME_OVERHEAD = 6 + 11
+
+PRESS_TIME = 0.1  # How long a simulated user holds a button
+SELECT_AFTER_BACK = 0.5
+MAX_BACK_PRESSES = 3
+
+
+def airtime(payload_len):
+    return (payload_len + FRAME_OVERHEAD) * 8 / BITRATE
+
+
+class Channel:
+    """Shared broadcast medium; decides which receivers hear each transmission"""
+
+    def __init__(self, sim, loss, rng):
+        self.sim = sim
+        self.loss = loss
+        self.rng = rng
+        self.active = []  # [start, end, sender, collided] still on air or recent
+        self.transmissions = 0
+        self.busy_time = 0.0
+
+    def transmit(self, device, dest, data):
+        start = device.clock.monotonic()
+        end = start + airtime(len(data))
+        tx = [start, end, device, False]
+
+        # Anything overlapping in time corrupts both frames for every receiver
+        self.active = [other for other in self.active if other[1] > start - 1.0]
+        for other in self.active:
+            if other[0] < end and start < other[1]:
+                other[3] = True
+                tx[3] = True
+        self.active.append(tx)
+        self.transmissions += 1
+        self.busy_time += end - start
+        self.sim.schedule(end, self.sim.deliver, tx, data)
+
+
+class BadgeNode:
+    def __init__(self, index, device, app):
+        self.index = index
+        self.device = device
+        self.app = app
+        self.cpu = 0.0
+        self.awaiting_display = []  # transmit start times of packets queued for display
+
+
+class MeshSim:
+    def __init__(self, count, duration, rate, loss, seed):
+        self.duration = duration
+        self.rate = rate
+        self.rng = random.Random(seed)
+        self.channel = Channel(self, loss, self.rng)
+        self.queue = []
+        self.seq = 0
+
+        self.nodes = []
+        for i in range(count):
+            device = badge.Device(badge_id=0x100 + i)
+            device.radio.channel = self.channel
+            node = BadgeNode(i, device, appenv.open_app(device))
+            self.nodes.append(node)
+            self.schedule(self.rng.uniform(0, 0.05), self.run_loop, node)
+            self.schedule(self.rng.expovariate(rate), self.press, node)
+
+        self.intents = 0  # Emoji the simulated users set out to send
+        self.receptions = 0
+        self.lost = 0
+        self.collision_drops = 0
+        self.half_duplex_drops = 0
+        self.latencies = []
+
+    def schedule(self, at, action, *args):
+        self.seq += 1
+        heapq.heappush(self.queue, (at, self.seq, action, args))
+
+    def run(self):
+        while self.queue:
+            at, _, action, args = heapq.heappop(self.queue)
+            if at > self.duration:
+                break
+            action(at, *args)
+        return self.report()
+
+    def _enter(self, node, at):
+        node.device.activate()
+        node.device.clock.now = at
+
+    def run_loop(self, at, node):
+        self._enter(node, at)
+        shows = len(node.device.display.shows)
+        started = time.perf_counter()
+        node.app.loop()
+        node.cpu += time.perf_counter() - started
+
+        # The received screen was redrawn: everything queued so far is now visible
+        if node.awaiting_display and len(node.device.display.shows) > shows:
+            shown_at = node.device.display.shows[shows]
+            for sent_at in node.awaiting_display:
+                self.latencies.append(shown_at - sent_at)
+            node.awaiting_display = []
+
+        # loop() sleeps on the device clock; it runs again when that sleep ends
+        self.schedule(max(node.device.clock.now, at + 0.001), self.run_loop, node)
+
+    def press(self, at, node, attempt=0):
+        """A user sending an emoji: back out to the menu first if needed"""
+        app = node.app
+        if app.current_screen == "menu":
+            node.device.input.pressed.add(self.rng.choice(list(app.button_map)))
+        else:
+            node.device.input.pressed.add("SW5")
+            if attempt < MAX_BACK_PRESSES:
+                # Pick the emoji once the menu has had time to settle
+                self.schedule(at + SELECT_AFTER_BACK, self.press, node, attempt + 1)
+        self.schedule(at + PRESS_TIME, self.release, node)
+        if attempt == 0:
+            self.intents += 1
+            self.schedule(at + self.rng.expovariate(self.rate), self.press, node)
+
+    def release(self, at, node):
+        node.device.input.pressed.clear()
+
+    def deliver(self, at, tx, data):
+        start, end, sender, collided = tx
+        for node in self.nodes:
+            if node.device is sender:
+                continue
+            if collided:
+                self.collision_drops += 1
+                continue
+            if self._transmitting(node.device, start, end):
+                self.half_duplex_drops += 1
+                continue
+            if self.rng.random() < self.channel.loss:
+                self.lost += 1
+                continue
+
+            self.receptions += 1
+            self._enter(node, at)
+            pending = node.app.inbox.pending
+            started = time.perf_counter()
+            node.app.on_packet(badge.Packet(sender.badge_id, data), True)
+            node.cpu += time.perf_counter() - started
+            if node.app.inbox.pending > pending:
+                node.awaiting_display.append(start)
+
+    def _transmitting(self, device, start, end):
+        for other in self.channel.active:
+            if other[2] is device and other[0] < end and start < other[1]:
+                return True
+        return False
+
+    def report(self):
+        count = len(self.nodes)
+        expected = self.channel.transmissions * (count - 1)
+        latencies = sorted(self.latencies)
+        stats = [node.app.radio_handler.stats for node in self.nodes]
+
+        def percentile(p):
+            if not latencies:
+                return None
+            return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+        return {
+            "badges": count,
+            "duration_s": self.duration,
+            "transmissions": self.channel.transmissions,
+            # Incoming emoji take over the screen, so some intended sends never happen
+            "intended_selections": self.intents,
+            "selections": sum(s['sent_selections'] for s in stats),
+            "delivery_ratio": self.receptions / expected if expected else None,
+            "collision_drops": self.collision_drops,
+            "half_duplex_drops": self.half_duplex_drops,
+            "random_losses": self.lost,
+            "displayed": len(latencies),
+            "filtered": {key: sum(s[key] for s in stats) for key in ('duplicates', 'rate_limited', 'coalesced')},
+            "latency_ms": {
+                "mean": sum(latencies) / len(latencies) * 1000 if latencies else None,
+                "p95": percentile(0.95),
+                "max": latencies[-1] * 1000 if latencies else None,
+            },
+            "cpu_ms_per_badge_per_s": sum(node.cpu for node in self.nodes) / count / self.duration * 1000,
+            "airtime_utilization": self.channel.busy_time / self.duration,
+        }
+
+
+def _fmt(value, spec):
+    return format(value, spec) if value is not None else "-"
+
+
+def main():
+    args = sys.argv[1:]
+    options = {"--badges": "2,5,10,20", "--duration": "30", "--rate": "0.05",
+               "--loss": "0.02", "--seed": "1", "--json": None}
+    for name in list(options):
+        if name in args:
+            i = args.index(name)
+            options[name] = args[i + 1]
+            del args[i:i + 2]
+
+    reports = []
+    for count in [int(n) for n in options["--badges"].split(",")]:
+        sim = MeshSim(count, float(options["--duration"]), float(options["--rate"]),
+                      float(options["--loss"]), int(options["--seed"]))
+        reports.append(sim.run())
+
+    print(f"{'badges':>6} {'sent':>9} {'tx':>5} {'delivery':>8} {'coll':>5} {'shown':>6} "
+          f"{'lat mean':>9} {'lat p95':>8} {'lat max':>8} {'cpu ms/s':>8} {'airtime':>8}")
+    for r in reports:
+        latency = r["latency_ms"]
+        sent = f"{r['selections']}/{r['intended_selections']}"
+        print(f"{r['badges']:>6} {sent:>9} {r['transmissions']:>5} {_fmt(r['delivery_ratio'], '8.1%')} "
+              f"{r['collision_drops']:>5} {r['displayed']:>6} {_fmt(latency['mean'], '9.1f')} "
+              f"{_fmt(latency['p95'], '8.1f')} {_fmt(latency['max'], '8.1f')} "
+              f"{r['cpu_ms_per_badge_per_s']:8.2f} {r['airtime_utilization']:8.3%}")
+
+    if options["--json"]:
+        with open(options["--json"], "w") as f:
+            json.dump(reports, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
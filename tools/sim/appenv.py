@@ -0,0 +1,73 @@
+# Import main.py the way the badge firmware does, against the stub badge module
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+import types
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+SIM_DIR = os.path.join(ROOT, "tools", "sim")
+
+if SIM_DIR not in sys.path:
+    sys.path.insert(0, SIM_DIR)
+
+import badge  # noqa: E402  (stub)
+
+# Files the app writes at run time (asset stamps, the sprite atlas, the
+# background receive log), removed on exit
+STATE_DIR = tempfile.mkdtemp(prefix="emojito-sim-")
+atexit.register(shutil.rmtree, STATE_DIR, True)
+
+
+class _ActiveSleep:
+    """Stands in for the time module in main.py: sleeps on the active device's clock"""
+
+    def sleep(self, seconds):
+        badge.time.sleep(seconds)
+
+
+def load_app_module():
+    """Return the app's main module, imported as apps.emojito.main"""
+    # The firmware imports apps from /apps; alias that package to this checkout
+    if "apps.emojito" not in sys.modules:
+        apps = sys.modules.get("apps") or types.ModuleType("apps")
+        apps.__path__ = []
+        package = types.ModuleType("apps.emojito")
+        package.__path__ = [ROOT]
+        apps.emojito = package
+        sys.modules["apps"] = apps
+        sys.modules["apps.emojito"] = package
+
+    import apps.emojito.main as app_module
+    app_module.time = _ActiveSleep()
+    return app_module
+
+
+def app_dir():
+    """Directory standing in for /apps/emojito: a copy of assets/ under STATE_DIR
+
+    The app records stamps in its asset bundle on first open, so it runs
+    against a copy rather than the checked-in files.
+    """
+    path = os.path.join(STATE_DIR, "app")
+    if not os.path.isdir(path):
+        shutil.copytree(os.path.join(ROOT, "assets"), os.path.join(path, "assets"))
+    return path
+
+
+def open_app(device):
+    """Activate device, create an App reading assets from this checkout, and open it"""
+    device.activate()
+    app_module = load_app_module()
+    app = app_module.App()
+    app.logger = badge.Logger()
+
+    # The app looks for its files under /apps/emojito on the badge
+    app._initialize_helpers()
+    app.pbm_parser.base_dir = app_dir()
+    app.sprite_atlas.path = os.path.join(app_dir(), "atlas.bin")
+    app.receive_log.path = os.path.join(STATE_DIR, f"received-{device.badge_id:04X}.bin")
+
+    app.on_open()
+    return app
@@ -0,0 +1,255 @@
+# Stub of the badge firmware module for running the app on plain CPython
+#
+# Module attributes (display, input, buzzer, radio, contacts, time) are those
+# of the active Device. The default device runs on the real clock; create a
+# Device and activate() it for a virtual clock, or to switch between several
+# simulated badges.
+import time as _time
+
+import framebuf
+
+
+class Logger:
+    """Logger that keeps messages in memory instead of printing them"""
+
+    def __init__(self, echo=False):
+        self.lines = []
+        self.echo = echo
+
+    def _log(self, level, msg):
+        self.lines.append((level, msg))
+        if self.echo:
+            print(f"[{level}] {msg}")
+
+    def debug(self, msg):
+        self._log("debug", msg)
+
+    def info(self, msg):
+        self._log("info", msg)
+
+    def warning(self, msg):
+        self._log("warning", msg)
+
+    def error(self, msg):
+        self._log("error", msg)
+
+
+class _Time:
+    def monotonic(self):
+        return _time.monotonic()
+
+    def sleep(self, seconds):
+        _time.sleep(seconds)
+
+
+class VirtualClock:
+    """Clock that only moves when told to; sleep() advances it instantly"""
+
+    def __init__(self, start=0.0):
+        self.now = start
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        if seconds > 0:
+            self.now += seconds
+
+    def advance(self, seconds):
+        self.sleep(seconds)
+
+
+class Display(framebuf.FrameBuffer):
+    """200x200 1-bit framebuffer that counts drawing calls and records refreshes"""
+
+    PRIMITIVES = ("fill", "pixel", "hline", "vline", "fill_rect", "rect", "blit", "text", "nice_text")
+
+    def __init__(self, clock, width=200, height=200, refresh_time=0.0, partial_refresh=False):
+        super().__init__(bytearray(((width + 7) // 8) * height), width, height, framebuf.MONO_HLSB)
+        self.clock = clock
+        self.refresh_time = refresh_time  # Seconds each show() costs on the clock
+        self.counts = dict.fromkeys(self.PRIMITIVES, 0)
+        self.shows = []  # clock time at each full refresh
+        self.partial_shows = []  # (time, x, y, w, h)
+        if partial_refresh:
+            self.show_partial = self._show_partial
+
+    @property
+    def primitives(self):
+        return sum(self.counts.values())
+
+    def reset_counts(self):
+        self.counts = dict.fromkeys(self.PRIMITIVES, 0)
+
+    def fill(self, c):
+        self.counts["fill"] += 1
+        super().fill(c)
+
+    def pixel(self, x, y, c=None):
+        self.counts["pixel"] += 1
+        return super().pixel(x, y, c)
+
+    def hline(self, x, y, w, c):
+        self.counts["hline"] += 1
+        super().hline(x, y, w, c)
+
+    def vline(self, x, y, h, c):
+        self.counts["vline"] += 1
+        super().vline(x, y, h, c)
+
+    def fill_rect(self, x, y, w, h, c):
+        self.counts["fill_rect"] += 1
+        super().fill_rect(x, y, w, h, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        self.counts["rect"] += 1
+        super().rect(x, y, w, h, c, f)
+
+    def blit(self, source, x, y, key=-1):
+        self.counts["blit"] += 1
+        super().blit(source, x, y, key)
+
+    def text(self, s, x, y, c=1):
+        self.counts["text"] += 1
+        super().text(s, x, y, c)
+
+    def nice_text(self, s, x, y, font=18, color=0):
+        """Proportional text: each glyph is a box whose width depends on the character"""
+        self.counts["nice_text"] += 1
+        for ch in s:
+            advance = glyph_advance(ch, font)
+            if ch != " ":
+                self._rect(x, y + font // 4, advance - 1, font - font // 4, color)
+            x += advance
+
+    def show(self):
+        self.clock.sleep(self.refresh_time)
+        self.shows.append(self.clock.monotonic())
+
+    def _show_partial(self, x, y, w, h):
+        self.partial_shows.append((self.clock.monotonic(), x, y, w, h))
+
+    def black_pixels(self):
+        """Count of black (clear) pixels, a cheap fingerprint of what is drawn"""
+        white = 0
+        for byte in self.buf:
+            white += bin(byte).count("1")
+        return self.width * self.height - white
+
+
+def glyph_advance(ch, font):
+    """Width of a character in the simulated proportional fonts"""
+    if ch in "il.,:;!'|":
+        return max(2, font // 4)
+    if ch in "MWmw@%":
+        return font * 3 // 4
+    if ch == " ":
+        return font // 3
+    return font // 2
+
+
+class Buttons:
+    pass
+
+
+for _n in range(1, 19):
+    setattr(Buttons, f"SW{_n}", f"SW{_n}")
+
+
+class Input:
+    Buttons = Buttons
+
+    def __init__(self):
+        self.pressed = set()
+        self.reads = 0
+
+    def get_button(self, button):
+        self.reads += 1
+        return button in self.pressed
+
+
+class Buzzer:
+    """Records tones; each tone blocks, so it advances a virtual clock"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.tones = []  # (start time, frequency, seconds)
+
+    def tone(self, freq, seconds):
+        self.tones.append((self.clock.monotonic(), freq, seconds))
+        if isinstance(self.clock, VirtualClock):
+            self.clock.sleep(seconds)
+
+
+class Radio:
+    """Records sent packets and hands them to a channel when one is attached"""
+
+    def __init__(self, device):
+        self.device = device
+        self.channel = None  # Object with transmit(device, dest, data)
+        self.sent = []  # (time, destination, data)
+
+    def send_packet(self, dest, data):
+        data = bytes(data)
+        self.sent.append((self.device.clock.monotonic(), dest, data))
+        if self.channel is not None:
+            self.channel.transmit(self.device, dest, data)
+
+
+class Packet:
+    def __init__(self, source, data, dest=0xFFFF):
+        self.source = source
+        self.dest = dest
+        self.data = data
+
+
+class Contact:
+    def __init__(self, handle):
+        self.handle = handle
+
+
+class Contacts:
+    def __init__(self, handle="me", known=None):
+        self.handle = handle
+        self.known = known if known is not None else {}  # badge_id -> handle
+        self.lookups = 0
+
+    def get_contact_by_badge_id(self, badge_id):
+        self.lookups += 1
+        handle = self.known.get(badge_id)
+        return Contact(handle) if handle else None
+
+    def my_contact(self):
+        self.lookups += 1
+        return Contact(self.handle)
+
+
+class Device:
+    """One simulated badge; activate() makes it what `import badge` sees"""
+
+    def __init__(self, badge_id=1, clock=None, handle=None, width=200, height=200,
+                 refresh_time=0.0, partial_refresh=False):
+        self.badge_id = badge_id
+        self.clock = clock if clock is not None else VirtualClock()
+        self.display = Display(self.clock, width, height, refresh_time, partial_refresh)
+        self.input = Input()
+        self.buzzer = Buzzer(self.clock)
+        self.radio = Radio(self)
+        self.contacts = Contacts(handle or f"badge{badge_id:04X}")
+
+    def activate(self):
+        global time, display, input, buzzer, radio, contacts
+        time = self.clock
+        display = self.display
+        input = self.input
+        buzzer = self.buzzer
+        radio = self.radio
+        contacts = self.contacts
+        return self
+
+
+class BaseApp:
+    logger = Logger()
+
+
+Device(clock=_Time()).activate()
@@ -0,0 +1,121 @@
+# Pure-Python stand-in for MicroPython's framebuf module (MONO_HLSB only)
+
+MONO_HLSB = 3
+
+
+class FrameBuffer:
+    """1 bit per pixel, rows packed MSB first; a set bit is white on the badge"""
+
+    def __init__(self, buf, width, height, fmt=MONO_HLSB, stride=None):
+        if fmt != MONO_HLSB:
+            raise ValueError("only MONO_HLSB is supported")
+        # MicroPython asks for a writable buffer, even to blit from
+        if memoryview(buf).readonly:
+            raise TypeError("object with buffer protocol required")
+        self.width = width
+        self.height = height
+        # stride is in pixels, as in MicroPython; kept here in bytes
+        self.stride = ((stride or width) + 7) // 8
+        if height and len(buf) < self.stride * (height - 1) + (width + 7) // 8:
+            raise ValueError("buffer too small")
+        self.buf = buf
+
+    # Public drawing methods only call the underscored helpers, so a subclass
+    # that counts calls sees each public call once
+
+    def pixel(self, x, y, c=None):
+        if c is None:
+            return self._get(x, y)
+        self._put(x, y, c)
+
+    def fill(self, c):
+        value = 0xFF if c else 0x00
+        size = self.stride * self.height
+        self.buf[0:size] = bytes([value]) * size
+
+    def hline(self, x, y, w, c):
+        self._span(x, x + w, y, c)
+
+    def vline(self, x, y, h, c):
+        self._vspan(x, y, y + h, c)
+
+    def fill_rect(self, x, y, w, h, c):
+        for row in range(max(0, y), min(self.height, y + h)):
+            self._span(x, x + w, row, c)
+
+    def rect(self, x, y, w, h, c, f=False):
+        if f:
+            for row in range(max(0, y), min(self.height, y + h)):
+                self._span(x, x + w, row, c)
+        else:
+            self._rect(x, y, w, h, c)
+
+    def blit(self, source, x, y, key=-1):
+        width = source.width
+        height = source.height
+        for row in range(height):
+            dy = y + row
+            if not 0 <= dy < self.height:
+                continue
+            if key == -1 and x >= 0 and x & 7 == 0 and x + width <= self.width and width & 7 == 0:
+                # Byte-aligned: copy whole bytes
+                src_start = row * source.stride
+                dst_start = dy * self.stride + (x >> 3)
+                self.buf[dst_start:dst_start + width // 8] = source.buf[src_start:src_start + width // 8]
+                continue
+            for col in range(width):
+                value = source._get(col, row)
+                if value != key:
+                    self._put(x + col, dy, value)
+
+    def text(self, s, x, y, c=1):
+        # 8x8 cells; each visible character is drawn as a box
+        for i, ch in enumerate(s):
+            if ch != " ":
+                self._rect(x + i * 8, y, 7, 7, c)
+
+    def _get(self, x, y):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return None
+        return 1 if self.buf[y * self.stride + (x >> 3)] & (0x80 >> (x & 7)) else 0
+
+    def _put(self, x, y, c):
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return
+        i = y * self.stride + (x >> 3)
+        mask = 0x80 >> (x & 7)
+        if c:
+            self.buf[i] |= mask
+        else:
+            self.buf[i] &= ~mask & 0xFF
+
+    def _vspan(self, x, y0, y1, c):
+        for row in range(y0, y1):
+            self._put(x, row, c)
+
+    def _rect(self, x, y, w, h, c):
+        if w <= 0 or h <= 0:
+            return
+        self._span(x, x + w, y, c)
+        self._span(x, x + w, y + h - 1, c)
+        self._vspan(x, y, y + h, c)
+        self._vspan(x + w - 1, y, y + h, c)
+
+    def _span(self, x0, x1, y, c):
+        """Set pixels [x0, x1) of row y, whole bytes at a time where possible"""
+        if not 0 <= y < self.height:
+            return
+        x0 = max(0, x0)
+        x1 = min(self.width, x1)
+        row = y * self.stride
+        while x0 < x1 and x0 & 7:
+            self._put(x0, y, c)
+            x0 += 1
+        full_end = x1 & ~7
+        if x0 < full_end:
+            count = (full_end - x0) >> 3
+            self.buf[row + (x0 >> 3):row + (x0 >> 3) + count] = bytes([0xFF if c else 0x00]) * count
+            x0 = full_end
+        while x0 < x1:
+            self._put(x0, y, c)
+            x0 += 1
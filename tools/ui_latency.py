@@ -0,0 +1,177 @@
+"""UI response latency harness.
+
+Runs the app against the stub badge module on a virtual clock and replays a
+scripted timeline of button presses and incoming packets. For every input
+it reports how long the app took to present a new frame, plus the longest
+single loop() iteration. It then checks the background path: packets
+handed over with is_foreground=False must chirp from the callback and draw
+nothing, even while loop() keeps running, and show up once the app is
+opened again:
+
+    python tools/ui_latency.py [timeline_file] [--refresh-ms N]
+
+A timeline file has one event per line, "<seconds> <action> <arg>", where
+action is press, release or packet (arg is an emoji key, optionally
+followed by a sender badge id). Without a file a built-in script is used.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "sim"))
+
+import appenv  # noqa: E402
+import badge  # noqa: E402  (stub)
+
+DEFAULT_TIMELINE = """
+0.5 press SW9
+0.6 release SW9
+1.0 press SW5
+1.1 release SW5
+2.0 packet heart 17
+3.0 packet poo 42
+3.5 press SW4
+3.6 release SW4
+3.8 press SW3
+3.9 release SW3
+4.0 press SW5
+4.05 release SW5
+4.2 press SW6
+4.25 release SW6
+4.3 press SW5
+4.35 release SW5
+5.0 press SW5
+5.1 release SW5
+6.0 packet skull 17
+40.0 press SW10
+40.1 release SW10
+"""
+
+
+def parse_timeline(text):
+    events = []
+    for line in text.splitlines():
+        line = line.split("#")[0].strip()
+        if not line:
+            continue
+        parts = line.split()
+        events.append((float(parts[0]), parts[1], parts[2:]))
+    events.sort(key=lambda event: event[0])
+    return events
+
+
+def run(events, refresh_ms=0.0, tail=2.0):
+    # Each full refresh costs refresh_ms on the clock, like a slow e-paper panel
+    device = badge.Device(refresh_time=refresh_ms / 1000)
+    clock = device.clock
+    app = appenv.open_app(device)
+    from apps.emojito.helpers import packet_codec
+
+    results = []  # (time, description, latency or None)
+    pending = list(events)
+    end = (events[-1][0] if events else 0) + tail
+    waiting = []  # inputs not yet answered by a frame: (time, description, shows before)
+    worst_loop = 0.0
+    seq = 0
+
+    while clock.now < end:
+        while pending and pending[0][0] <= clock.now:
+            at, action, args = pending.pop(0)
+            if action != "release":
+                # A frame after the next input cannot be credited to earlier ones
+                for waited_at, description, _ in waiting:
+                    results.append((waited_at, description, None))
+                waiting = []
+            if action == "press":
+                device.input.pressed.add(args[0])
+                waiting.append((at, f"press {args[0]} on {app.current_screen}", len(device.display.shows)))
+            elif action == "release":
+                device.input.pressed.discard(args[0])
+            elif action == "packet":
+                seq += 1
+                source = int(args[1]) if len(args) > 1 else 1
+                packet = badge.Packet(source, packet_codec.encode_emoji(args[0], seq=seq))
+                app.on_packet(packet, True)
+                waiting.append((at, f"packet {args[0]}", len(device.display.shows)))
+
+        started = clock.now
+        app.loop()
+        worst_loop = max(worst_loop, clock.now - started)
+
+        still_waiting = []
+        for at, description, shows_before in waiting:
+            shows = device.display.shows
+            if len(shows) > shows_before:
+                results.append((at, description, shows[shows_before] - at))
+            elif clock.now - at > 1.0:
+                results.append((at, description, None))  # Ignored by design (debounce) or lost
+            else:
+                still_waiting.append((at, description, shows_before))
+        waiting = still_waiting
+
+    return results, worst_loop
+
+
+def check_background(seconds=8.0):
+    """Deliver background packets and return a list of what went wrong"""
+    device = badge.Device()
+    clock = device.clock
+    app = appenv.open_app(device)
+    interval = appenv.load_app_module().ALERT_INTERVAL
+    from apps.emojito.helpers import packet_codec
+
+    problems = []
+    shows = len(device.display.shows)
+    tones = len(device.buzzer.tones)
+    start = clock.now
+    # Two packets inside ALERT_INTERVAL, then one after it
+    for seq, (emoji_key, gap) in enumerate((("heart", 0), ("poo", 0.5), ("skull", interval)), 1):
+        clock.advance(gap)
+        app.on_packet(badge.Packet(17, packet_codec.encode_emoji(emoji_key, seq=seq)), False)
+    while clock.now - start < seconds:
+        app.loop()
+
+    chirps = len(device.buzzer.tones) - tones
+    if chirps != 2:
+        problems.append(f"{chirps} chirps for 3 packets, expected 2")
+    if len(device.display.shows) != shows or app.current_screen != "menu":
+        problems.append(f"drew in the background (screen {app.current_screen})")
+
+    app.on_open()
+    app.loop()
+    if app.current_screen != "received" or app.inbox.get(0)[0] != "skull":
+        problems.append("background packets not shown after on_open()")
+    return problems
+
+
+def main():
+    args = sys.argv[1:]
+    refresh_ms = 0.0
+    if "--refresh-ms" in args:
+        i = args.index("--refresh-ms")
+        refresh_ms = float(args[i + 1])
+        del args[i:i + 2]
+    if args:
+        with open(args[0]) as f:
+            text = f.read()
+    else:
+        text = DEFAULT_TIMELINE
+
+    results, worst_loop = run(parse_timeline(text), refresh_ms)
+    answered = [latency for _, _, latency in results if latency is not None]
+    for at, description, latency in results:
+        shown = f"{latency * 1000:7.1f} ms" if latency is not None else "    no redraw"
+        print(f"{at:7.2f}s  {description:28s} {shown}")
+    print()
+    if answered:
+        print(f"worst response:  {max(answered) * 1000:.1f} ms")
+        print(f"mean response:   {sum(answered) / len(answered) * 1000:.1f} ms")
+    print(f"longest loop():  {worst_loop * 1000:.1f} ms")
+
+    problems = check_background()
+    print(f"background:      {'; '.join(problems) if problems else 'ok'}")
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()